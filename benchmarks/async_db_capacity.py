@@ -0,0 +1,116 @@
+"""Egyidejű kérések kiszolgálása szinkron és async session-nel.
+
+Két végpontot terhel ugyanannyi párhuzamos kéréssel: az egyik `def` +
+SessionDep (Starlette threadpool), a másik `async def` + AsyncSessionDep.
+Az Azure SQL kerekútját egy SQLite függvény szimulálja, ami a kapcsolat
+saját szálán alszik, így az async oldalon nem blokkolja az event loopot.
+
+A szinkron végpont kapacitását a threadpool mérete (alapból 40) korlátozza,
+az async végpontét csak a connection pool. A pool ezért itt nagyra van véve.
+
+Futtatás a repo gyökeréből:
+    python -m benchmarks.async_db_capacity [kérések száma] [késleltetés ms] [threadpool]
+    python -m benchmarks.async_db_capacity 400 200 40
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/async_db_capacity.db"
+)
+os.environ.setdefault("DB_POOL_SIZE", "500")
+os.environ.setdefault("DB_WARMUP_CONNECTIONS", "1")
+
+import anyio.to_thread
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import event
+from sqlmodel import text
+
+from database.connection import (
+    AsyncSessionDep,
+    SessionDep,
+    async_engine,
+    engine,
+)
+
+
+def _sleep_ms(milliseconds):
+    time.sleep(milliseconds / 1000)
+    return milliseconds
+
+
+@event.listens_for(engine, "connect")
+@event.listens_for(async_engine.sync_engine, "connect")
+def register_sleep(dbapi_connection, _):
+    # aiosqlite adapternél a nyers sqlite3 kapcsolat a driver_connection mögött van
+    raw = getattr(dbapi_connection, "driver_connection", dbapi_connection)
+    raw = getattr(raw, "_conn", raw)
+    raw.create_function("sleep_ms", 1, _sleep_ms)
+
+
+QUERY = text("SELECT sleep_ms(:ms)")
+
+app = FastAPI()
+
+
+@app.get("/sync")
+def sync_endpoint(session: SessionDep, ms: int):
+    return {"ms": session.exec(QUERY, params={"ms": ms}).scalar()}
+
+
+@app.get("/async")
+async def async_endpoint(session: AsyncSessionDep, ms: int):
+    return {"ms": (await session.exec(QUERY, params={"ms": ms})).scalar()}
+
+
+async def load(path: str, requests: int, latency_ms: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+
+        async def one():
+            started = time.perf_counter()
+            response = await c.get(path, params={"ms": latency_ms})
+            response.raise_for_status()
+            return time.perf_counter() - started
+
+        # Bemelegítés: a poolban legyenek nyitott kapcsolatok
+        await asyncio.gather(*(one() for _ in range(requests)))
+
+        started = time.perf_counter()
+        latencies = sorted(await asyncio.gather(*(one() for _ in range(requests))))
+        elapsed = time.perf_counter() - started
+
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{path:7} {elapsed:6.2f} s, {requests / elapsed:7.0f} kérés/s, "
+        f"medián {statistics.median(latencies) * 1000:6.0f} ms, "
+        f"p99 {p99 * 1000:6.0f} ms"
+    )
+
+
+async def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    latency_ms = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 40
+
+    anyio.to_thread.current_default_thread_limiter().total_tokens = threads
+    ideal = latency_ms / 1000
+    print(
+        f"{requests} párhuzamos kérés, {latency_ms} ms DB késleltetés, "
+        f"{threads} szálas threadpool"
+    )
+    print(f"szinkron elméleti minimum: {ideal * -(-requests // threads):.2f} s")
+
+    await load("/sync", requests, latency_ms)
+    await load("/async", requests, latency_ms)
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
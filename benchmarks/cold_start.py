@@ -0,0 +1,98 @@
+"""Hidegindulás mérése: import, lifespan és az első 200-as válaszok ideje.
+
+Minden ismétlés friss Python folyamatban fut, mint egy nulláról felskálázott
+App Service példány. A folyamat méri a `main` importját, az indulást (séma
+ellenőrzés, pool előmelegítés), majd az első /auth/me és /api/v1/todo/all
+válasz idejét, és kiírja, hogy a nehéz csomagok közül mi töltődött be.
+
+A tesztfelhasználót (coldstart) létrehozza, ha még nincs.
+
+Futtatás a repo gyökeréből:
+    python -m benchmarks.cold_start "mssql+pyodbc://..." [ismétlések]
+    python -m benchmarks.cold_start sqlite:///cold_start.db 5
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("pandas", "numpy", "pdfplumber", "pypdfium2", "openpyxl", "azure")
+USERNAME = "coldstart"
+
+
+def child():
+    started = time.perf_counter()
+    import main
+
+    imported = time.perf_counter()
+
+    from fastapi.testclient import TestClient
+
+    timings = {"import": imported - started}
+    client_imported = time.perf_counter()
+    with TestClient(main.app) as client:
+        timings["lifespan"] = time.perf_counter() - client_imported
+        client.cookies.set("access_token", os.environ["COLD_START_TOKEN"])
+
+        for name, path in (("/auth/me", "/auth/me"), ("/todo/all", "/api/v1/todo/all")):
+            requested = time.perf_counter()
+            response = client.get(path)
+            response.raise_for_status()
+            timings[name] = time.perf_counter() - requested
+
+    timings["total"] = sum(timings.values())
+    loaded = sorted(m for m in HEAVY_MODULES if m in sys.modules)
+    print(json.dumps({"timings": timings, "loaded": loaded}))
+
+
+def prepare(url: str) -> str:
+    os.environ["DATABASE_URL"] = url
+
+    from sqlmodel import Session, select
+
+    from database.connection import create_db_and_tables, engine
+    from database.models import User
+    from routers.auth.oauth2 import create_access_token
+    from utils.hashing import Hash
+
+    create_db_and_tables()
+    with Session(engine) as session:
+        if not session.exec(select(User).where(User.username == USERNAME)).first():
+            session.add(
+                User(username=USERNAME, hashed_password=Hash.bcrypt("coldstart"))
+            )
+            session.commit()
+    return create_access_token({"username": USERNAME})
+
+
+def main():
+    url = sys.argv[1]
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    env = {**os.environ, "DATABASE_URL": url, "COLD_START_TOKEN": prepare(url)}
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.cold_start", "--child"],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{repeats} hidegindulás, medián:")
+    for name in runs[0]["timings"]:
+        median = statistics.median(run["timings"][name] for run in runs)
+        print(f"  {name:10} {median * 1000:8.1f} ms")
+    print(f"betöltött nehéz csomagok: {', '.join(runs[0]['loaded']) or '-'}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--child"]:
+        child()
+    else:
+        main()
@@ -0,0 +1,130 @@
+"""Regressziós ellenőrzés: eltérő tartalomfolyam- és pozíciósorrend.
+
+A pypdfium2 a szöveget a tartalomfolyam sorrendjében adja vissza, a
+pdfplumber (és így a feldolgozó) viszont pozíció szerint rendezi a sorokat.
+Ha egy oldalon a lapszám előbb van kirajzolva, mint a fölötte álló
+szakaszfejléc, a két sorrend első sora eltér. Az oldaltérkép és a pypdfium2
+backend ettől nem hagyhat ki és nem olvashat félre oldalt.
+
+Minden esetben összeveti a kimenetet az előszűrés és backend nélküli
+feldolgozással (minden oldal pdfplumber layout-szövege), és eltérésnél
+hibával kilép.
+
+Futtatás a repo gyökeréből:
+    python -m benchmarks.content_order
+"""
+
+import ctypes
+import io
+import sys
+
+import pdfplumber
+import pypdfium2
+import pypdfium2.raw as pdfium_c
+
+from services.invoice_processor import InvoiceProcessor, build_page_index
+
+SERVICE_PAGE = [
+    (800, "KISZÁMLÁZOTT DÍJAK"),
+    (770, "Telefonszám: 36301234567"),
+    (755, "Tarifacsomag: Red"),
+    (740, "Megnevezés TESZOR Nettó ÁFA kulcs ÁFA Bruttó"),
+    (725, "Havi díj 61.20.1 1.000,00 27% 270,00 1.270,00"),
+    (710, "Kiszámlázott díjak összesen 1.000,00 270,00 1.270,00"),
+]
+# (név, oldalak); minden oldal (y, sor) párok kirajzolási sorrendben. A
+# beépített Helvetica miatt csak Latin-1 karakterek szerepelhetnek.
+CASES = {
+    "lapszám a fejléc előtt": [[(795, "Oldal 1/1"), *SERVICE_PAGE]],
+    "fejléc a folyam végén": [[*SERVICE_PAGE[1:], SERVICE_PAGE[0]]],
+    "hívásrészletező sor a folyam elején": [
+        [(650, "HÍVÁSRÉSZLETEZÉS"), *SERVICE_PAGE],
+    ],
+    "hívásrészletező oldal": [
+        SERVICE_PAGE,
+        [(795, "Oldal 2/2"), (800, "HÍVÁSRÉSZLETEZÉS"), (770, "hívás 1")],
+    ],
+    "szakaszzáró sor a díjtételek előtt": [
+        [*SERVICE_PAGE[:4], SERVICE_PAGE[5], SERVICE_PAGE[4]],
+    ],
+    "táblafejléc a díjtétel után": [
+        [*SERVICE_PAGE[:3], SERVICE_PAGE[4], SERVICE_PAGE[3], SERVICE_PAGE[5]],
+    ],
+    "tarifacsomag a telefonszám előtt": [
+        [SERVICE_PAGE[0], SERVICE_PAGE[2], SERVICE_PAGE[1], *SERVICE_PAGE[3:]],
+    ],
+    "tájékoztató fejlécű folytatólap a szakaszon belül": [
+        SERVICE_PAGE[:5],
+        [
+            (800, "TÁJÉKOZTATÓ a díjakról"),
+            (770, "Roaming díj 61.20.1 500,00 27% 135,00 635,00"),
+            (755, "Kiszámlázott díjak összesen 1.500,00 405,00 1.905,00"),
+        ],
+    ],
+}
+
+
+class ReferenceProcessor(InvoiceProcessor):
+    """Oldaltérkép és kihagyás nélkül: minden oldal pdfplumber layout-szövege."""
+
+    def _page_texts(self):
+        with pdfplumber.open(io.BytesIO(self.pdf_source)) as pdf:
+            for page in pdf.pages:
+                yield page.extract_text() or ""
+
+
+def make_pdf(pages) -> bytes:
+    pdf = pypdfium2.PdfDocument.new()
+    font = pdfium_c.FPDFText_LoadStandardFont(pdf.raw, b"Helvetica")
+    for lines in pages:
+        page = pdf.new_page(595, 842)
+        for y, line in lines:
+            text = pdfium_c.FPDFPageObj_CreateTextObj(pdf.raw, font, 9.0)
+            encoded = ctypes.create_string_buffer((line + "\x00").encode("utf-16-le"))
+            pdfium_c.FPDFText_SetText(
+                text, ctypes.cast(encoded, ctypes.POINTER(pdfium_c.FPDF_WCHAR))
+            )
+            pdfium_c.FPDFPageObj_Transform(text, 1, 0, 0, 1, 30, y)
+            pdfium_c.FPDFPage_InsertObject(page.raw, text)
+        pdfium_c.FPDFPage_GenerateContent(page.raw)
+        page.close()
+
+    buffer = io.BytesIO()
+    pdf.save(buffer)
+    pdf.close()
+    return buffer.getvalue()
+
+
+def rows(result):
+    return result["invoice_summary"], result["service_charges"]
+
+
+def main():
+    failures = 0
+    for name, pages in CASES.items():
+        pdf_bytes = make_pdf(pages)
+
+        reference = ReferenceProcessor(pdf_bytes, workers=1)
+        reference.page_index = [
+            {"page": number, "kind": "unknown"} for number in range(1, len(pages) + 1)
+        ]
+        expected = rows(reference.process())
+
+        page_index = build_page_index(pdf_bytes)
+        for backend in ("pdfplumber", "pypdfium2"):
+            actual = rows(
+                InvoiceProcessor(pdf_bytes, workers=1, backend=backend).process()
+            )
+            ok = actual == expected
+            failures += not ok
+            print(
+                f"{'OK ' if ok else 'HIBA'} {name} / {backend}: "
+                f"{len(actual[1])} díjtétel, {len(actual[0])} összesítő sor "
+                f"(várt: {len(expected[1])}, {len(expected[0])}); "
+                f"oldaltérkép: {[entry['kind'] for entry in page_index]}"
+            )
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Szövegkinyerő backendek összevetése egy valódi számlán.
+
+Backendenként méri a feldolgozási sebességet, és soronként összeveti a
+kinyert sorokat a pdfplumber (referencia) kimenetével.
+
+Futtatás a repo gyökeréből:
+    python -m benchmarks.extraction_backends szamla.pdf
+"""
+
+import sys
+import time
+
+from services.invoice_processor import (
+    EXTRACTION_BACKENDS,
+    InvoiceProcessor,
+    PdfiumDocument,
+)
+
+
+def row_diff(reference, rows):
+    mismatches = [
+        (index, expected, actual)
+        for index, (expected, actual) in enumerate(zip(reference, rows))
+        if expected != actual
+    ]
+    return mismatches, len(rows) - len(reference)
+
+
+def count_fallback_pages(pdf_bytes):
+    document = PdfiumDocument(pdf_bytes)
+    try:
+        for index in range(len(document)):
+            document.page_text(index)
+        return len(document), document.fallback_pages
+    finally:
+        document.close()
+
+
+def main():
+    with open(sys.argv[1], "rb") as f:
+        pdf_bytes = f.read()
+
+    results = {}
+    for backend in EXTRACTION_BACKENDS:
+        started = time.perf_counter()
+        results[backend] = InvoiceProcessor(
+            pdf_bytes, workers=1, backend=backend
+        ).process()
+        elapsed = time.perf_counter() - started
+        print(
+            f"{backend:>10}: {elapsed:7.2f} s, "
+            f"{len(results[backend]['service_charges'])} díjtétel, "
+            f"{len(results[backend]['invoice_summary'])} összesítő sor"
+        )
+
+    page_count, fallback_pages = count_fallback_pages(pdf_bytes)
+    print(f"pypdfium2 visszaesés pdfplumberre: {fallback_pages}/{page_count} oldal")
+
+    reference = results["pdfplumber"]
+    for backend, result in results.items():
+        if backend == "pdfplumber":
+            continue
+        for kind in ("invoice_summary", "service_charges"):
+            mismatches, length_delta = row_diff(reference[kind], result[kind])
+            print(
+                f"{backend} / {kind}: {len(mismatches)} eltérő sor, "
+                f"sorszám-különbség {length_delta:+d}"
+            )
+            for index, expected, actual in mismatches[:10]:
+                print(
+                    f"  #{index}\n    pdfplumber: {expected}\n    {backend}: {actual}"
+                )
+
+
+if __name__ == "__main__":
+    main()
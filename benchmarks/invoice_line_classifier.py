@@ -0,0 +1,119 @@
+"""Soronkénti számlafeldolgozás mérése: régi (többmenetes) vs. egymenetes osztályozó.
+
+Futtatás a repo gyökeréből:
+    python -m benchmarks.invoice_line_classifier [blokkok száma]
+"""
+
+import random
+import re
+import sys
+import time
+
+from services.invoice_processor import _ServiceBlock
+
+
+def legacy_service_charges(lines):
+    # Az egymenetes osztályozó előtti megvalósítás, összehasonlításhoz
+    rows = []
+    phone_number = "N/A"
+    for line in lines:
+        if "Tarifacsomag:" in line:
+            break
+        match = re.search(r"Telefonszám:\s*(36\d{9})", line)
+        if match:
+            phone_number = match.group(1)
+            break
+
+    try:
+        start_index = next(
+            i for i, line in enumerate(lines) if line.strip().startswith("Megnevezés")
+        )
+        end_index = next(
+            i
+            for i, line in enumerate(lines)
+            if line.strip().startswith("Kiszámlázott díjak összesen")
+        )
+    except StopIteration:
+        return rows
+
+    for line in lines[start_index + 1 : end_index]:
+        teszor_match = re.search(r"\b\d{2}\.\d{2}\.\d{1,2}\b", line)
+        if not teszor_match:
+            continue
+        teszor = teszor_match.group()
+        parts = line.rsplit(" ", 4)
+        if len(parts) < 5:
+            continue
+        total_amount, vat_amount, vat_rate, net_amount = parts[-4:]
+        before_values = parts[0]
+        description = (
+            before_values.split(teszor)[0].strip()
+            if teszor in before_values
+            else before_values.strip()
+        )
+        rows.append(
+            [
+                phone_number,
+                description,
+                teszor,
+                net_amount,
+                vat_rate,
+                vat_amount,
+                total_amount,
+            ]
+        )
+    return rows
+
+
+def make_blocks(count: int, seed: int = 42):
+    rnd = random.Random(seed)
+    blocks = []
+    for i in range(count):
+        lines = [
+            "KISZÁMLÁZOTT DÍJAK",
+            f"Telefonszám: 3630{i:07d}",
+            "Tarifacsomag: Red Business",
+            "Megnevezés TESZOR Nettó ÁFA kulcs ÁFA Bruttó",
+        ]
+        for j in range(rnd.randint(10, 80)):
+            teszor = rnd.choice(["61.20.1", "61.20.42", "61.10.1"])
+            lines.append(
+                f"Havi díj {j} {teszor} {rnd.randint(1, 9999)},00 27% "
+                f"{rnd.randint(1, 999)},00 {rnd.randint(1, 9999)},00"
+            )
+            if rnd.random() < 0.2:
+                lines.append("Kedvezmény megjegyzés")
+        lines.append("Kiszámlázott díjak összesen 1.000,00 270,00 1.270,00")
+        blocks.append(lines)
+    return blocks
+
+
+def single_pass(lines):
+    block = _ServiceBlock()
+    block.feed(lines)
+    return list(block.rows())
+
+
+def measure(func, blocks, line_count):
+    started = time.perf_counter()
+    rows = [row for lines in blocks for row in func(lines)]
+    elapsed = time.perf_counter() - started
+    return rows, line_count / elapsed
+
+
+def main():
+    block_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    blocks = make_blocks(block_count)
+    line_count = sum(len(lines) for lines in blocks)
+
+    legacy_rows, legacy_rate = measure(legacy_service_charges, blocks, line_count)
+    new_rows, new_rate = measure(single_pass, blocks, line_count)
+
+    assert legacy_rows == new_rows, "a két megvalósítás kimenete eltér"
+    print(f"{line_count} sor, {len(new_rows)} díjtétel")
+    print(f"régi:       {legacy_rate:12,.0f} sor/s")
+    print(f"egymenetes: {new_rate:12,.0f} sor/s ({new_rate / legacy_rate:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
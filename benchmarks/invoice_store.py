@@ -0,0 +1,90 @@
+"""Számlasorok mentésének mérése: store_invoice vs. soronkénti ORM beszúrás.
+
+Véletlen díjtételekből álló számlát ment el a megadott adatbázisba, egyszer
+kötegelt beszúrással (store_invoice), egyszer soronként session.add-dal, és
+ellenőrzi, hogy ugyanannak a PDF-nek az újbóli mentése nem ír új sort.
+
+A mért sorok bent maradnak (period 2000-01), ezért teszt adatbázison futtasd.
+
+Futtatás a repo gyökeréből (a táblákat létrehozza, ha még nincsenek):
+    python -m benchmarks.invoice_store "mssql+pyodbc://..." [sorok száma]
+    python -m benchmarks.invoice_store sqlite:///invoice_bench.db 50000
+"""
+
+import hashlib
+import random
+import sys
+import time
+
+from sqlmodel import Session, SQLModel, create_engine, func, select
+
+from database.models import Invoice, InvoiceLine
+from services.invoice_store import line_values, store_invoice
+
+VAT_RATES = ["27%", "5%", "AHK", "TAM"]
+
+
+def amount():
+    thousands = f"{random.randint(0, 99999):,}".replace(",", ".")
+    return f"{thousands},{random.randint(0, 99):02d}"
+
+
+def random_rows(count):
+    return [
+        (
+            f"+36 30 {random.randint(1000000, 9999999)}",
+            "Havi díj",
+            f"61.{random.choice((10, 20, 30))}.{random.randint(1, 39)}",
+            amount(),
+            amount(),
+            random.choice(VAT_RATES),
+            amount(),
+        )
+        for _ in range(count)
+    ]
+
+
+def main():
+    url = sys.argv[1]
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+
+    options = {"fast_executemany": True} if url.startswith("mssql+pyodbc") else {}
+    engine = create_engine(url, **options)
+    SQLModel.metadata.create_all(
+        engine, tables=[Invoice.__table__, InvoiceLine.__table__]
+    )
+
+    result = {"service_charges": random_rows(count), "invoice_summary": []}
+    sha256 = hashlib.sha256(str(random.random()).encode()).hexdigest()
+
+    with Session(engine) as session:
+        started = time.perf_counter()
+        invoice = store_invoice(session, sha256, result, "2000-01", "bench.pdf")
+        print(f"store_invoice: {time.perf_counter() - started:7.2f} s, {count} sor")
+
+        started = time.perf_counter()
+        again = store_invoice(session, sha256, result, "2000-01", "bench.pdf")
+        lines = session.exec(
+            select(func.count())
+            .select_from(InvoiceLine)
+            .where(InvoiceLine.invoice_id == invoice.id)
+        ).one()
+        print(
+            f"ismételt mentés: {time.perf_counter() - started:7.2f} s, "
+            f"ugyanaz a számla: {again.id == invoice.id}, sorok: {lines}"
+        )
+
+    with Session(engine) as session:
+        reference = Invoice(sha256=sha256[::-1], period="2000-01", line_count=count)
+        session.add(reference)
+        session.flush()
+
+        started = time.perf_counter()
+        for row in result["service_charges"]:
+            session.add(InvoiceLine(**line_values(reference.id, "2000-01", row)))
+        session.commit()
+        print(f"soronkénti ORM: {time.perf_counter() - started:7.2f} s, {count} sor")
+
+
+if __name__ == "__main__":
+    main()
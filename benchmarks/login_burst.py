@@ -0,0 +1,118 @@
+"""Todo és szinkron végpont késleltetése egy 100 belépésből álló hullám alatt.
+
+Egy felhasználó todo listáját (async végpont) és a Vodafone törzsadat
+végpontot (szinkron, a Starlette threadpoolján fut) kérdezi folyamatosan,
+először terhelés nélkül, majd miközben N párhuzamos belépés érkezik.
+A --shared-threadpool kapcsolóval a bcrypt a korábbi módon, a közös
+threadpoolon fut (összehasonlításhoz).
+
+Az IP korlátot a mérés idejére kikapcsolja (egy IP-ről jön minden kérés).
+
+Futtatás a repo gyökeréből:
+    python -m benchmarks.login_burst [belépések száma] [--shared-threadpool]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/login_burst.db"
+)
+os.environ.setdefault("LOGIN_MAX_ATTEMPTS_PER_IP", "100000")
+
+import httpx
+from starlette.concurrency import run_in_threadpool
+
+import main
+from routers.auth import authentication
+
+USERNAME = "burstuser"
+PROBES = {
+    "todo (async)": "/api/v1/todo/all?category=work",
+    "törzsadat (szinkron)": "/api/v1/vodafone/extraction-support",
+}
+
+
+async def probe(client, path: str, until: asyncio.Event) -> list:
+    latencies = []
+    while not until.is_set():
+        started = time.perf_counter()
+        (await client.get(path)).raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.02)
+    return latencies
+
+
+async def measure(client, label: str, burst: int):
+    done = asyncio.Event()
+    probes = [
+        asyncio.create_task(probe(client, path, done)) for path in PROBES.values()
+    ]
+
+    statuses = {}
+    started = time.perf_counter()
+    if burst:
+        responses = await asyncio.gather(
+            *(
+                client.post(
+                    "/auth/login", data={"username": USERNAME, "password": USERNAME}
+                )
+                for _ in range(burst)
+            )
+        )
+        for response in responses:
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    else:
+        await asyncio.sleep(2)
+    elapsed = time.perf_counter() - started
+
+    done.set()
+    print(f"{label} ({elapsed:.1f} s) belépések: {statuses or '-'}")
+    for name, task in zip(PROBES, probes):
+        latencies = sorted(await task)
+        p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+        print(
+            f"  {name:22} medián {statistics.median(latencies) * 1000:7.1f} ms, "
+            f"p99 {p99 * 1000:7.1f} ms, max {latencies[-1] * 1000:7.1f} ms"
+        )
+
+
+async def run(burst: int):
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=120
+        ) as client:
+            await client.post(
+                "/auth/register", json={"username": USERNAME, "password": USERNAME}
+            )
+            response = await client.post(
+                "/auth/login", data={"username": USERNAME, "password": USERNAME}
+            )
+            client.cookies.set("access_token", response.json()["access_token"])
+
+            await measure(client, "terhelés nélkül", 0)
+            await measure(client, f"{burst} párhuzamos belépés", burst)
+
+
+def main_():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    burst = int(args[0]) if args else 100
+
+    if "--shared-threadpool" in sys.argv:
+
+        async def shared_threadpool(func, *args):
+            return await run_in_threadpool(func, *args)
+
+        authentication.run_password_hash = shared_threadpool
+        print("bcrypt a közös threadpoolon")
+
+    asyncio.run(run(burst))
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,122 @@
+"""Adatbázis-lekérdezések száma kérésenként az azonosításnál, három beállítással.
+
+  - nincs cache: minden kérés lekérdezi a felhasználót (a korábbi viselkedés)
+  - cache: a feloldott felhasználó PRINCIPAL_CACHE_TTL_SECONDS-ig a memóriában
+  - token claimek: a friss token id/szerep claimjei alapján, adatbázis nélkül
+
+Minden beállítás külön folyamatban fut (a beállítások import időben olvasódnak).
+A lekérdezéseket az async engine-en számolja; a megadott késleltetés minden
+lekérdezéshez hozzáadódik, az Azure SQL kerekútját szimulálva.
+
+Futtatás a repo gyökeréből:
+    python -m benchmarks.principal_cache sqlite:///principal_bench.db [kérések] [késleltetés ms]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+USERNAME = "principal"
+MODES = {
+    "nincs cache": {
+        "PRINCIPAL_CACHE_TTL_SECONDS": "0",
+        "TOKEN_PRINCIPAL_CLAIMS": "false",
+    },
+    "cache": {"PRINCIPAL_CACHE_TTL_SECONDS": "60", "TOKEN_PRINCIPAL_CLAIMS": "false"},
+    "token claimek": {
+        "PRINCIPAL_CACHE_TTL_SECONDS": "60",
+        "TOKEN_PRINCIPAL_CLAIMS": "true",
+    },
+}
+PATHS = ("/auth/me", "/api/v1/todo/all?category=work")
+
+
+def child(requests: int, latency_ms: float):
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    import main
+    from database.connection import async_engine
+
+    statements = []
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+        time.sleep(latency_ms / 1000)
+
+    results = {}
+    with TestClient(main.app) as client:
+        response = client.post(
+            "/auth/login", data={"username": USERNAME, "password": USERNAME}
+        )
+        client.cookies.set("access_token", response.json()["access_token"])
+
+        for path in PATHS:
+            statements.clear()
+            started = time.perf_counter()
+            for _ in range(requests):
+                client.get(path).raise_for_status()
+            elapsed = time.perf_counter() - started
+            users = sum("FROM users" in statement for statement in statements)
+            results[path] = {
+                "queries": len(statements) / requests,
+                "user_queries": users / requests,
+                "ms": elapsed / requests * 1000,
+            }
+    print(json.dumps(results))
+
+
+def prepare(url: str):
+    os.environ["DATABASE_URL"] = url
+
+    from sqlmodel import Session, select
+
+    from database.connection import create_db_and_tables, engine
+    from database.models import User
+    from utils.hashing import Hash
+
+    create_db_and_tables()
+    with Session(engine) as session:
+        if not session.exec(select(User).where(User.username == USERNAME)).first():
+            session.add(User(username=USERNAME, hashed_password=Hash.bcrypt(USERNAME)))
+            session.commit()
+
+
+def main():
+    url = sys.argv[1]
+    requests = sys.argv[2] if len(sys.argv) > 2 else "200"
+    latency_ms = sys.argv[3] if len(sys.argv) > 3 else "2"
+    prepare(url)
+
+    print(f"{requests} kérés végpontonként, {latency_ms} ms/lekérdezés")
+    for mode, settings in MODES.items():
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.principal_cache",
+                "--child",
+                requests,
+                latency_ms,
+            ],
+            env={**os.environ, "DATABASE_URL": url, **settings},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        results = json.loads(output.strip().splitlines()[-1])
+        for path, result in results.items():
+            print(
+                f"{mode:14} {path:32} {result['queries']:5.2f} lekérdezés/kérés "
+                f"(users: {result['user_queries']:4.2f}), {result['ms']:6.2f} ms/kérés"
+            )
+
+
+if __name__ == "__main__":
+    if sys.argv[1] == "--child":
+        child(int(sys.argv[2]), float(sys.argv[3]))
+    else:
+        main()
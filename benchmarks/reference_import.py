@@ -0,0 +1,66 @@
+"""Telefonkönyv importálásának mérése: első betöltés, módosított fájl, változatlan fájl.
+
+Véletlen telefonkönyvet generál CSV-be, és háromszor importálja a megadott
+adatbázisba: üres táblára, majd úgy, hogy a sorok 10%-ának tulajdonosa
+változik, 5% kimarad és 5% új, végül ugyanazzal a fájllal még egyszer.
+
+A PhoneBook tábla tartalmát lecseréli, ezért teszt adatbázison futtasd.
+
+Futtatás a repo gyökeréből (a táblákat létrehozza, ha még nincsenek):
+    python -m benchmarks.reference_import "mssql+pyodbc://..." [sorok száma]
+    python -m benchmarks.reference_import sqlite:///reference_bench.db 10000
+"""
+
+import io
+import random
+import sys
+import time
+
+from sqlmodel import Session, SQLModel, create_engine, delete
+
+from database.models import PhoneBook, ReferenceDataVersion
+from services.reference_import import PHONEBOOK_COLUMNS, import_phonebook, read_table
+
+
+def phonebook_csv(rows):
+    lines = ["phone_number;owner"]
+    lines += [f"{phone_number};{owner}" for phone_number, owner in rows]
+    return io.BytesIO("\n".join(lines).encode("utf-8"))
+
+
+def measure(engine, label, rows):
+    started = time.perf_counter()
+    df = read_table(phonebook_csv(rows), "phonebook.csv", PHONEBOOK_COLUMNS)
+    with Session(engine) as session:
+        summary = import_phonebook(session, df, delete_missing=True)
+    print(f"{label:18} {time.perf_counter() - started:6.2f} s  {summary}")
+
+
+def main():
+    url = sys.argv[1]
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+    options = {"fast_executemany": True} if url.startswith("mssql+pyodbc") else {}
+    engine = create_engine(url, **options)
+    SQLModel.metadata.create_all(
+        engine, tables=[PhoneBook.__table__, ReferenceDataVersion.__table__]
+    )
+    with Session(engine) as session:
+        session.exec(delete(PhoneBook))
+        session.commit()
+
+    numbers = random.sample(range(1000000, 9999999), count + count // 20)
+    rows = [(f"+36 30 {n}", f"Dolgozó {n % 997}") for n in numbers[:count]]
+    measure(engine, "első betöltés", rows)
+
+    changed = [
+        (phone_number, owner + " (új)" if random.random() < 0.1 else owner)
+        for phone_number, owner in rows[count // 20 :]
+    ]
+    changed += [(f"+36 30 {n}", "Új dolgozó") for n in numbers[count:]]
+    measure(engine, "módosított fájl", changed)
+    measure(engine, "változatlan fájl", changed)
+
+
+if __name__ == "__main__":
+    main()
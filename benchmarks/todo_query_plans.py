@@ -0,0 +1,177 @@
+"""A todo végpontok lekérdezéseinek végrehajtási terve és késleltetése SQLite-on.
+
+Friss SQLite adatbázist tölt fel szintetikus adatokkal (felhasználónként
+vegyes kategóriájú, státuszú és határidejű todókkal, ANALYZE után), majd a
+services.todo_queries minden lekérdezésére:
+  - EXPLAIN QUERY PLAN: a todo tábla egyik lépésben sem lehet SCAN (teljes
+    tábla- vagy indexbejárás), csak SEARCH egy indexen;
+  - mediánkésleltetés ORM-en át, a sorok betöltésével, a budget alatt kell maradjon.
+
+Hiba esetén 1-es kóddal lép ki, így CI-ban is futtatható. A --drop-indexes
+kapcsolóval a Todo összetett indexei nélkül fut (összehasonlításhoz).
+
+Futtatás a repo gyökeréből:
+    python -m benchmarks.todo_query_plans [felhasználók] [todo/felhasználó] [budget ms]
+    python -m benchmarks.todo_query_plans 200 1000 20
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session, SQLModel, create_engine, insert, text
+
+from database.models import Category, Status, Todo, User
+from services.todo_queries import (
+    category_counts_query,
+    done_between_query,
+    due_between_query,
+    todos_count_query,
+    todos_query,
+    upcoming_query,
+)
+
+REPEATS = 20
+SEED_BATCH_SIZE = 10000
+
+
+def todo_rows(user_id: int, count: int, now: datetime):
+    for number in range(count):
+        status = random.choice(list(Status))
+        created_at = now - timedelta(days=random.uniform(0, 365))
+        yield {
+            "title": f"Todo {user_id}-{number}",
+            "category": random.choice(list(Category)),
+            "status": status,
+            "created_at": created_at,
+            "modified_at": created_at,
+            "deadline": now + timedelta(days=random.uniform(-180, 180)),
+            "completed_at": (
+                now - timedelta(days=random.uniform(0, 180))
+                if status == Status.done
+                else None
+            ),
+            "priority": random.randint(1, 5),
+            "archived": False,
+            "user_id": user_id,
+        }
+
+
+def seed(engine, users: int, per_user: int, now: datetime):
+    SQLModel.metadata.create_all(engine, tables=[User.__table__, Todo.__table__])
+    with Session(engine) as session:
+        session.exec(
+            insert(User),
+            params=[
+                {"username": f"user{n}", "hashed_password": "-", "created_at": now}
+                for n in range(1, users + 1)
+            ],
+        )
+        batch = []
+        for user_id in range(1, users + 1):
+            batch.extend(todo_rows(user_id, per_user, now))
+            if len(batch) >= SEED_BATCH_SIZE:
+                session.exec(insert(Todo), params=batch)
+                batch = []
+        if batch:
+            session.exec(insert(Todo), params=batch)
+        session.commit()
+    with engine.connect() as connection:
+        connection.exec_driver_sql("ANALYZE")
+
+
+def cases(user_id: int, now: datetime):
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = today - timedelta(days=now.weekday())
+    return {
+        "/all": todos_query(user_id, "work"),
+        "/all?status": todos_query(user_id, "work", "progress"),
+        "/all count": todos_count_query(user_id, "work"),
+        "/stats": category_counts_query(user_id),
+        "/upcoming": upcoming_query(user_id, today, today + timedelta(days=7)),
+        "/daily done": done_between_query(user_id, today, today + timedelta(days=1)),
+        "/daily due": due_between_query(user_id, today, today + timedelta(days=1)),
+        "/weekly done": done_between_query(
+            user_id, week_start, week_start + timedelta(days=7)
+        ),
+        "/weekly due": due_between_query(
+            user_id, week_start, week_start + timedelta(days=7)
+        ),
+    }
+
+
+def query_plan(session: Session, statement) -> list[str]:
+    sql = statement.compile(
+        dialect=session.get_bind().dialect, compile_kwargs={"literal_binds": True}
+    )
+    rows = session.exec(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    return [row[-1] for row in rows]
+
+
+def median_ms(session: Session, statement) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        session.exec(statement).all()
+        timings.append(time.perf_counter() - started)
+        session.expunge_all()
+    return statistics.median(timings) * 1000
+
+
+def run(engine, users: int, per_user: int, budget_ms: float, drop_indexes: bool) -> int:
+    now = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    seed(engine, users, per_user, now)
+    print(
+        f"{users * per_user} todo ({users} felhasználó), "
+        f"feltöltés {time.perf_counter() - started:.1f} s, budget {budget_ms} ms"
+    )
+
+    if drop_indexes:
+        with engine.begin() as connection:
+            for index in Todo.__table__.indexes:
+                if index.name != "ix_todo_title":
+                    connection.exec_driver_sql(f"DROP INDEX {index.name}")
+
+    failures = 0
+    with Session(engine) as session:
+        for name, statement in cases(random.randint(1, users), now).items():
+            plan = query_plan(session, statement)
+            scans = [step for step in plan if step.startswith("SCAN todo")]
+            elapsed = median_ms(session, statement)
+
+            ok = not scans and elapsed <= budget_ms
+            failures += not ok
+            print(
+                f"{'OK  ' if ok else 'FAIL'} {name:13} {elapsed:7.2f} ms  {' | '.join(plan)}"
+            )
+
+    return failures
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    users = int(args[0]) if len(args) > 0 else 200
+    per_user = int(args[1]) if len(args) > 1 else 1000
+    budget_ms = float(args[2]) if len(args) > 2 else 20
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        failures = run(engine, users, per_user, budget_ms, "--drop-indexes" in sys.argv)
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+    if failures:
+        print(f"{failures} lekérdezés nem felelt meg")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
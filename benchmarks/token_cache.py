@@ -0,0 +1,78 @@
+"""Az azonosítás CPU költsége kérésenként, adatbázis nélkül.
+
+  - jwt.decode: az aláírás ellenőrzése minden kérésnél (a korábbi viselkedés)
+  - token cache: az ellenőrzött claimek a verified_token_cache-ből
+  - függőség: a teljes get_current_user (Bearer), a friss token claimjeiből
+    feloldva, cache nélkül és cache-sel
+
+A két beállítás ugyanabban a folyamatban fut, a cache méretét átállítva.
+
+Futtatás a repo gyökeréből:
+    python -m benchmarks.token_cache [ismétlések]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///token_cache_bench.db")
+
+
+def measure(func, repeats: int) -> float:
+    """Egy hívás átlagos ideje mikroszekundumban."""
+    func()
+    started = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - started) / repeats * 1_000_000
+
+
+def main(repeats: int):
+    from datetime import datetime, timezone
+
+    from jose import jwt
+
+    from database.models import Role, User
+    from routers.auth.oauth2 import (
+        algorithm,
+        create_access_token,
+        secret_key,
+        verified_claims,
+    )
+    from services.principal_cache import principal_claims
+    from services.token_cache import TOKEN_CACHE_ENTRIES, verified_token_cache
+    from utils.dependencies import get_current_user
+
+    user = User(
+        id=1,
+        username="bench",
+        hashed_password="x",
+        role=Role.member,
+        created_at=datetime.now(timezone.utc),
+    )
+    token = create_access_token(data=principal_claims(user))
+    loop = asyncio.new_event_loop()
+
+    def dependency():
+        loop.run_until_complete(get_current_user(session=None, token=token))
+
+    results = {
+        "jwt.decode": measure(
+            lambda: jwt.decode(token, secret_key, algorithms=[algorithm]), repeats
+        )
+    }
+    verified_token_cache.max_entries = 0
+    results["függőség, cache nélkül"] = measure(dependency, repeats)
+
+    verified_token_cache.max_entries = TOKEN_CACHE_ENTRIES or 1
+    results["token cache"] = measure(lambda: verified_claims(token), repeats)
+    results["függőség, cache-sel"] = measure(dependency, repeats)
+    loop.close()
+
+    for name, micros in results.items():
+        print(f"{name:<24} {micros:8.1f} µs/kérés")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
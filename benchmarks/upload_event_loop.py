@@ -0,0 +1,76 @@
+"""Az event loop késleltetése párhuzamos számlafeldolgozás közben.
+
+Egy 10 ms-onként ébredő "ping" korutin méri, mennyit késik az ébredés, amíg
+több számla feldolgozása fut: egyszer közvetlenül a loopon (a régi async
+upload viselkedése), egyszer az UploadExecutor folyamatkészletén keresztül.
+A ping késés p50/p99 értéke a többi végpont (pl. todo) válaszidejét közelíti.
+
+Futtatás a repo gyökeréből:
+    python -m benchmarks.upload_event_loop szamla.pdf [párhuzamos feltöltések]
+"""
+
+import asyncio
+import sys
+import time
+
+from services.invoice_processor import InvoiceProcessor
+from services.upload_executor import get_upload_executor
+
+PING_INTERVAL = 0.01
+
+
+async def ping(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PING_INTERVAL)
+        lags.append(time.perf_counter() - started - PING_INTERVAL)
+
+
+def percentile(values, ratio):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+async def measure(label, uploads):
+    lags = []
+    stop = asyncio.Event()
+    pinger = asyncio.create_task(ping(stop, lags))
+
+    started = time.perf_counter()
+    await asyncio.gather(*uploads)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await pinger
+    print(
+        f"{label:>10}: {elapsed:6.2f} s, ping késés "
+        f"p50 {percentile(lags, 0.5) * 1000:7.1f} ms, "
+        f"p99 {percentile(lags, 0.99) * 1000:7.1f} ms, "
+        f"max {max(lags) * 1000:7.1f} ms"
+    )
+
+
+async def inline_upload(pdf_bytes):
+    # A régi upload: szinkron feldolgozás az async végpontban
+    InvoiceProcessor(pdf_bytes, workers=1).process()
+
+
+async def main():
+    with open(sys.argv[1], "rb") as f:
+        pdf_bytes = f.read()
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+
+    # Eltérő tartalom, hogy a parse cache ne rövidítse le a mérést
+    variants = [pdf_bytes + f"\n%{i}".encode() for i in range(concurrency)]
+
+    await measure("loopon", [inline_upload(data) for data in variants])
+
+    executor = get_upload_executor()
+    # A spawn folyamatok indítása ne számítson bele a mérésbe
+    await executor.parse(pdf_bytes + b"\n%warmup")
+    await measure("executor", [executor.parse(data) for data in variants])
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,128 @@
+"""A ServiceCharges lap előállításának mérése: soronkénti apply vs. merge.
+
+Véletlen díjtételeken összeveti a régi (apply-alapú) és az új (merge +
+vektorizált összegfeldolgozás) megvalósítás kimenetét és futásidejét.
+
+Futtatás a repo gyökeréből:
+    python -m benchmarks.vodafone_mapping [10000,100000,1000000]
+"""
+
+import random
+import re
+import sys
+import time
+
+import pandas as pd
+
+from services.invoice_workbook import (
+    SERVICE_CHARGE_COLUMNS,
+    pivot_frame,
+    service_charges_frame,
+)
+
+TESZOR_CODES = [
+    f"61.{major}.{minor}" for major in (10, 20, 30) for minor in range(1, 40)
+]
+VAT_RATES = ["27%", "5%", "AHK", "TAM"]
+
+
+def legacy_service_charges_frame(rows, reference):
+    # A vektorizálás előtti megvalósítás, összehasonlításhoz
+    mapping_lookup = reference["mapping_lookup"]
+
+    def extract_mapping_info(row):
+        key = (row["TESZOR"], row["VATRate"])
+        return pd.Series(
+            mapping_lookup.get(
+                key,
+                {
+                    "Title": "Ismeretlen",
+                    "VatCode": "Ismeretlen",
+                    "LedgerAccount": "Ismeretlen",
+                },
+            )
+        )
+
+    def _clean_float(value):
+        try:
+            cleaned = value.replace(".", "").replace(",", ".").strip()
+            return float(cleaned) if re.match(r"^-?\d+(\.\d+)?$", cleaned) else None
+        except Exception:
+            return None
+
+    df_charges = pd.DataFrame(rows, columns=SERVICE_CHARGE_COLUMNS)
+    df_charges["Employee"] = (
+        df_charges["PhoneNumber"].map(reference["phone_user_map"]).fillna("N/A")
+    )
+    df_charges["LedgerTitle"] = (
+        df_charges["TESZOR"].map(reference["teszor_category_map"]).fillna("N/A")
+    )
+    title_df = df_charges.apply(extract_mapping_info, axis=1)
+    df = pd.concat([df_charges, title_df], axis=1)
+    for col in ["NetAmount", "VATAmount", "TotalAmount"]:
+        df[col] = df_charges[col].apply(_clean_float)
+    return df
+
+
+def make_reference(rnd):
+    mapping_lookup = {}
+    for teszor in TESZOR_CODES:
+        for rate in rnd.sample(VAT_RATES, 2):
+            mapping_lookup[(teszor, rate)] = {
+                "Title": f"Telefon {teszor}",
+                "VatCode": f"F{rate}",
+                "LedgerAccount": f"52{rnd.randint(100, 999)}",
+            }
+    return {
+        "phone_user_map": {f"3630{i:07d}": f"Dolgozó {i}" for i in range(0, 500, 2)},
+        "teszor_category_map": {t: f"Telefon {t}" for t in TESZOR_CODES[::2]},
+        "mapping_lookup": mapping_lookup,
+    }
+
+
+def amount(rnd):
+    value = f"{rnd.randint(-999, 999999):,}".replace(",", ".")
+    return rnd.choice([f"{value},{rnd.randint(0, 99):02d}", value, "-", "n/a"])
+
+
+def make_rows(count, rnd):
+    return [
+        [
+            f"3630{rnd.randint(0, 500):07d}",
+            f"Havi díj {i}",
+            rnd.choice(TESZOR_CODES),
+            amount(rnd),
+            amount(rnd),
+            rnd.choice(VAT_RATES),
+            amount(rnd),
+        ]
+        for i in range(count)
+    ]
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    sizes = sys.argv[1] if len(sys.argv) > 1 else "10000,100000,1000000"
+    rnd = random.Random(42)
+    reference = make_reference(rnd)
+
+    for size in map(int, sizes.split(",")):
+        rows = make_rows(size, rnd)
+        legacy, legacy_time = timed(legacy_service_charges_frame, rows, reference)
+        new, new_time = timed(service_charges_frame, rows, reference)
+
+        pd.testing.assert_frame_equal(legacy, new)
+        pd.testing.assert_frame_equal(pivot_frame(legacy), pivot_frame(new))
+        print(
+            f"{size:>9} sor: apply {legacy_time:8.2f} s, merge {new_time:6.2f} s "
+            f"({legacy_time / new_time:.0f}x), a lapok azonosak"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,314 @@
 from typing import Annotated
-from sqlmodel import Session, SQLModel, create_engine, text
-from fastapi import Depends
+from sqlmodel import Session, SQLModel, create_engine, select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import CreateIndex, CreateTable
+from fastapi import Depends, HTTPException, status
 from urllib.parse import quote_plus
+from database.models import SchemaFingerprint
 
+import asyncio
+import hashlib
 import os
+import time
 
-username = os.getenv("DB_USERNAME")
-password = quote_plus(os.getenv("DB_PASSWORD"))
-server = os.getenv("DB_SERVER")
-database = os.getenv("DB_DATABASE")
+# Teljes SQLAlchemy URL (pl. sqlite:///./local.db); ha üres, az Azure SQL beállítások kellenek
+DATABASE_URL = os.getenv("DATABASE_URL")
+# Az async engine URL-je; ha üres, a DATABASE_URL async driverre cserélve
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
 
-connection_string = (
-    f"mssql+pyodbc://{username}:{password}@{server}:1433/{database}"
-    "?driver=ODBC+Driver+17+for+SQL+Server"
-    "&encrypt=yes"
-    "&trustservercertificate=no"
-    "&connection+timeout=30"
-)
+# Szinkron driver → async megfelelője
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "mssql+pyodbc": "mssql+aioodbc",
+}
 
-engine = create_engine(connection_string, echo=True)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Ennél régebbi kapcsolatot újranyitunk (az Azure SQL kb. 30 perc után bontja a tétleneket)
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_POOL_TIMEOUT_SECONDS = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
 
+# Kapcsolódási hibánál ennyiszer próbáljuk újra, 0.5, 1, 2, ... másodperc várakozással
+DB_CONNECT_RETRIES = int(os.getenv("DB_CONNECT_RETRIES", "3"))
+DB_RETRY_BACKOFF_SECONDS = float(os.getenv("DB_RETRY_BACKOFF_SECONDS", "0.5"))
+# Induláskor ennyi kapcsolatot nyitunk meg előre a poolban
+DB_WARMUP_CONNECTIONS = int(os.getenv("DB_WARMUP_CONNECTIONS", str(DB_POOL_SIZE)))
+
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+
+def database_url() -> str:
+    if DATABASE_URL:
+        return DATABASE_URL
+
+    username = os.getenv("DB_USERNAME")
+    password = quote_plus(os.getenv("DB_PASSWORD"))
+    server = os.getenv("DB_SERVER")
+    database = os.getenv("DB_DATABASE")
+
+    return (
+        f"mssql+pyodbc://{username}:{password}@{server}:1433/{database}"
+        "?driver=ODBC+Driver+17+for+SQL+Server"
+        "&encrypt=yes"
+        "&trustservercertificate=no"
+        "&connection+timeout=30"
+    )
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (url.endswith("://") or ":memory:" in url)
+
+
+def _engine_options(url: str) -> dict:
+    options = {"echo": DB_ECHO, "pool_pre_ping": True}
+
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+    if _is_memory_sqlite(url):
+        # A memóriabeli adatbázis kapcsolatonként külön él, ezért egyetlen közös kapcsolat
+        options["poolclass"] = StaticPool
+    else:
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_recycle=DB_POOL_RECYCLE_SECONDS,
+            pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        )
+    return options
+
+
+def create_db_engine(url: str | None = None, **overrides):
+    """Engine a környezeti beállításokkal; az `overrides` felülírja a create_engine paramétereit."""
+    url = url or database_url()
+    options = _engine_options(url)
+    if url.startswith("mssql+pyodbc"):
+        # fast_executemany: a számlasorok kötegelt beszúrása egy kerekúttal
+        options["fast_executemany"] = True
+
+    options.update(overrides)
+    return create_engine(url, **options)
+
+
+def async_database_url() -> str:
+    if ASYNC_DATABASE_URL:
+        return ASYNC_DATABASE_URL
+
+    url = make_url(database_url())
+    driver = ASYNC_DRIVERS.get(url.drivername)
+    if driver is None:
+        raise ValueError(f"No async driver configured for {url.drivername}")
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def create_async_db_engine(url: str | None = None, **overrides):
+    """Az async engine ugyanazokkal a pool beállításokkal, mint a szinkron.
+
+    Memóriabeli SQLite-tal ValueError: az async engine külön kapcsolata egy
+    másik, üres adatbázist látna, amelyben a sémát sem hoztuk létre.
+    """
+    url = url or async_database_url()
+    if _is_memory_sqlite(url):
+        raise ValueError(
+            "In-memory SQLite cannot be shared between the sync and async engines; "
+            "use a file database (e.g. sqlite:///./local.db)"
+        )
+    options = _engine_options(url)
+    options.update(overrides)
+    return create_async_engine(url, **options)
+
+
+engine = create_db_engine()
+async_engine = create_async_db_engine()
+
+
+def schema_fingerprint() -> str:
+    """A modellekből generált CREATE TABLE/INDEX utasítások SHA-256 kivonata."""
+    ddl = []
+    for table in SQLModel.metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(dialect=engine.dialect)))
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            ddl.append(str(CreateIndex(index).compile(dialect=engine.dialect)))
+    return hashlib.sha256("\n".join(ddl).encode("utf-8")).hexdigest()
+
+
+def sync_indexes() -> list[str]:
+    """A modellekben szereplő, de az adatbázisból hiányzó indexek létrehozása.
+
+    A create_all meglévő táblához nem ad új indexet, ezért az index-változások
+    ezen a lépésen keresztül jutnak el a már futó adatbázisokba. Visszaadja a
+    létrehozott indexek nevét.
+    """
+    created = []
+    with retry_transient(engine.connect) as connection:
+        inspector = inspect(connection)
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name not in existing:
+                    index.create(connection)
+                    created.append(index.name)
+        connection.commit()
+    return created
+
+
+def sync_columns() -> list[str]:
+    """A modellekben szereplő, de az adatbázisból hiányzó NULL-os oszlopok hozzáadása.
+
+    A create_all meglévő táblát nem módosít, ezért az új oszlopok ezen a
+    lépésen keresztül jutnak el a már futó adatbázisokba. Kötelező oszlopot
+    nem adunk hozzá, a meglévő soroknak nem lenne értéke. Visszaadja a
+    hozzáadott oszlopok nevét (tábla.oszlop).
+    """
+    added = []
+    with retry_transient(engine.connect) as connection:
+        inspector = inspect(connection)
+        preparer = connection.dialect.identifier_preparer
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                connection.execute(
+                    text(
+                        f"ALTER TABLE {preparer.format_table(table)} "
+                        f"ADD {preparer.format_column(column)} "
+                        f"{column.type.compile(dialect=connection.dialect)}"
+                    )
+                )
+                added.append(f"{table.name}.{column.name}")
+        connection.commit()
+    return added
+
+
+def create_db_and_tables() -> bool:
+    """create_all, oszlop- és index-szinkron csak akkor, ha a modellek a legutóbbi futás óta változtak.
+
+    Egyező ujjlenyomatnál egyetlen lekérdezés fut, nem kérdezzük le minden
+    tábla metaadatát az épp ébredő adatbázisból. Visszaadja, hogy futott-e create_all.
+    """
+    fingerprint = schema_fingerprint()
+    statement = select(SchemaFingerprint.fingerprint).where(SchemaFingerprint.id == 1)
+
+    with retry_transient(engine.connect) as connection:
+        try:
+            stored = connection.execute(statement).scalar()
+        except DBAPIError:
+            # Még nincs ujjlenyomat tábla: első indulás
+            stored = None
+    if stored == fingerprint:
+        return False
 
-def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    sync_columns()
+    sync_indexes()
+    with Session(engine) as session:
+        session.merge(SchemaFingerprint(id=1, fingerprint=fingerprint))
+        session.commit()
+    return True
+
+
+def retry_transient(func):
+    """func() újrahívása átmeneti kapcsolódási hibánál, exponenciális várakozással.
+
+    Az utolsó sikertelen próbálkozás kivétele továbbmegy a hívóhoz.
+    """
+    for attempt in range(DB_CONNECT_RETRIES + 1):
+        try:
+            return func()
+        except TRANSIENT_ERRORS:
+            if attempt == DB_CONNECT_RETRIES:
+                raise
+            time.sleep(DB_RETRY_BACKOFF_SECONDS * 2**attempt)
+
+
+async def retry_transient_async(func):
+    """A retry_transient() async megfelelője; a várakozás nem blokkolja a loopot."""
+    for attempt in range(DB_CONNECT_RETRIES + 1):
+        try:
+            return await func()
+        except TRANSIENT_ERRORS:
+            if attempt == DB_CONNECT_RETRIES:
+                raise
+            await asyncio.sleep(DB_RETRY_BACKOFF_SECONDS * 2**attempt)
+
+
+def warm_up_pool(connections: int = DB_WARMUP_CONNECTIONS) -> float:
+    """Egyszerre `connections` kapcsolat megnyitása, hogy az első kérések ne várjanak.
+
+    Az alvó serverless Azure SQL ilyenkor ébred fel. Visszaadja az eltelt időt.
+    """
+    started = time.perf_counter()
+    opened = []
+    try:
+        for _ in range(max(connections, 1)):
+            connection = retry_transient(engine.connect)
+            connection.execute(text("SELECT 1"))
+            opened.append(connection)
+    finally:
+        for connection in opened:
+            connection.close()
+    return time.perf_counter() - started
+
+
+async def warm_up_async_pool(connections: int = DB_WARMUP_CONNECTIONS) -> float:
+    started = time.perf_counter()
+    opened = []
+    try:
+        for _ in range(max(connections, 1)):
+            connection = await retry_transient_async(async_engine.connect)
+            await connection.execute(text("SELECT 1"))
+            opened.append(connection)
+    finally:
+        for connection in opened:
+            await connection.close()
+    return time.perf_counter() - started
+
+
+def pool_status(pool=None) -> dict:
+    pool = pool or engine.pool
+    counters = {}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        counter = getattr(pool, name, None)
+        counters[name] = counter() if counter else None
+    return {"pool": type(pool).__name__, **counters}
 
 
 def get_session():
     with Session(engine) as session:
+        try:
+            # A kapcsolat felvétele itt történik, hogy az ébredő adatbázist újrapróbálhassuk
+            retry_transient(session.connection)
+        except TRANSIENT_ERRORS:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server waking up, please try again soon.",
+                headers={"Retry-After": "10"},
+            )
         yield session
 
 
 SessionDep = Annotated[Session, Depends(get_session)]
+
+
+async def get_async_session():
+    # expire_on_commit=False: commit után az attribútumok elérése ne indítson rejtett lekérdezést
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        try:
+            await retry_transient_async(session.connection)
+        except TRANSIENT_ERRORS:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server waking up, please try again soon.",
+                headers={"Retry-After": "10"},
+            )
+        yield session
+
+
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
@@ -1,6 +1,8 @@
 from sqlmodel import Field, SQLModel, Relationship
+from sqlalchemy import Index
 from typing import Optional, List
 from datetime import datetime, timezone
+from decimal import Decimal
 from enum import Enum
 
 
@@ -17,6 +19,8 @@ class User(SQLModel, table=True):
     role: Role = Field(default=Role.member)
     hashed_password: str = Field(max_length=255)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Jelszócserénél kell beállítani; a korábban kiadott tokenek ettől érvénytelenek
+    password_changed_at: Optional[datetime] = None
 
     todos: List["Todo"] = Relationship(back_populates="user")
 
@@ -59,6 +63,22 @@ class Status(str, Enum):
 
 
 class Todo(SQLModel, table=True):
+    # Minden todo lekérdezés a felhasználó soraira szűr, ezért mindegyik user_id-val kezdődik
+    __table_args__ = (
+        # /all szűrés és rendezés, valamint a kategóriánkénti darabszám (/stats, /upcoming)
+        Index(
+            "ix_todo_user_category_status_deadline",
+            "user_id",
+            "category",
+            "status",
+            "deadline",
+        ),
+        # Határidő tartomány (/upcoming, napi/heti esedékes); a státusz szűrés az indexben marad
+        Index("ix_todo_user_deadline_status", "user_id", "deadline", "status"),
+        # Napi/heti elvégzett: completed_at csak "done" státuszú todón van kitöltve
+        Index("ix_todo_user_completed_at", "user_id", "completed_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str = Field(index=True, min_length=3, max_length=255)
     description: Optional[str] = None
@@ -144,3 +164,100 @@ class TeszorMapping(SQLModel, table=True):
     # teszor_codes: List["TeszorCode"] = Relationship(back_populates="vat_setting")
 
     # teszor_codes: List["TeszorCode"] = Relationship(back_populates="ledger_account")
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class InvoiceJob(SQLModel, table=True):
+    id: str = Field(primary_key=True, max_length=32)
+    filename: str = Field(max_length=255)
+    status: JobStatus = Field(default=JobStatus.queued, index=True)
+    pages_done: int = Field(default=0)
+    pages_total: Optional[int] = None
+    error: Optional[str] = Field(default=None, max_length=1000)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    heartbeat_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: Optional[datetime] = None
+
+
+class InvoiceJobRead(SQLModel):
+    id: str
+    filename: str
+    status: JobStatus
+    pages_done: int
+    pages_total: Optional[int]
+    error: Optional[str]
+    created_at: datetime
+    finished_at: Optional[datetime]
+
+
+class ReferenceDataVersion(SQLModel, table=True):
+    # Egyetlen sor (id=1); minden PhoneBook/TESZOR írás növeli a verziót
+    id: Optional[int] = Field(default=None, primary_key=True)
+    version: int = Field(default=0)
+
+
+class SchemaFingerprint(SQLModel, table=True):
+    # Egyetlen sor (id=1); a legutóbb létrehozott séma DDL-jének SHA-256 kivonata
+    id: Optional[int] = Field(default=None, primary_key=True)
+    fingerprint: str = Field(max_length=64)
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class Invoice(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # A PDF tartalmának SHA-256 kivonata; ugyanaz a számla csak egyszer kerül be
+    sha256: str = Field(unique=True, max_length=64)
+    filename: Optional[str] = Field(default=None, max_length=255)
+    # Elszámolási hónap, "YYYY-MM"
+    period: str = Field(index=True, max_length=7)
+    line_count: int = Field(default=0)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    lines: List["InvoiceLine"] = Relationship(back_populates="invoice")
+
+
+class InvoiceLine(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_invoiceline_phone_number_period", "phone_number", "period"),
+        Index("ix_invoiceline_teszor_period", "teszor", "period"),
+        # Fedő index a havi riportokhoz: időszak szűrés + csoportosítás az összegekkel
+        Index(
+            "ix_invoiceline_period_report",
+            "period",
+            "phone_number",
+            "teszor",
+            "vat_rate",
+            mssql_include=["net_amount", "vat_amount", "total_amount"],
+        ),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    invoice_id: int = Field(foreign_key="invoice.id", index=True)
+    # Az Invoice.period másolata, hogy a riport indexek egy táblán legyenek
+    period: str = Field(max_length=7)
+    phone_number: str = Field(max_length=20)
+    description: Optional[str] = Field(default=None, max_length=255)
+    teszor: str = Field(max_length=20)
+    vat_rate: str = Field(max_length=10)
+    net_amount: Optional[Decimal] = Field(default=None, max_digits=14, decimal_places=2)
+    vat_amount: Optional[Decimal] = Field(default=None, max_digits=14, decimal_places=2)
+    total_amount: Optional[Decimal] = Field(
+        default=None, max_digits=14, decimal_places=2
+    )
+
+    invoice: Optional[Invoice] = Relationship(back_populates="lines")
+
+
+class InvoiceRead(SQLModel):
+    id: int
+    sha256: str
+    filename: Optional[str]
+    period: str
+    line_count: int
+    created_at: datetime
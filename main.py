@@ -1,11 +1,21 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database.connection import create_db_and_tables
+from database.connection import (
+    async_engine,
+    create_db_and_tables,
+    warm_up_async_pool,
+    warm_up_pool,
+)
 from contextlib import asynccontextmanager
 from routers.auth import authentication
-from routers.admin import users
+from routers.admin import users, reference_data
 from routers.todo import todos
 from routers.vodafone import vodafone
+from routers.reports import reports
+from routers.health import health
+from routers.upload import upload
+from services.invoice_jobs import run_job_maintenance
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,10 +23,18 @@ load_dotenv()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("📋 Táblák létrehozása...")
-    create_db_and_tables()
-    print("✅ Táblák létrehozva!")
+    print("📋 Séma ellenőrzése...")
+    if create_db_and_tables():
+        print("✅ Táblák létrehozva!")
+    else:
+        print("✅ Séma változatlan")
+    print(f"🔌 Kapcsolatok előmelegítve ({warm_up_pool():.2f} s)")
+    print(f"🔌 Async kapcsolatok előmelegítve ({await warm_up_async_pool():.2f} s)")
+    # Megszakadt számla jobok újraindítása és a lejártak törlése, induláskor és időnként
+    job_maintenance = asyncio.create_task(run_job_maintenance())
     yield
+    job_maintenance.cancel()
+    await async_engine.dispose()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -39,6 +57,10 @@ app.add_middleware(
 
 
 app.include_router(authentication.router)
+app.include_router(health.router)
 app.include_router(users.router, prefix="/api/v1")
+app.include_router(reference_data.router, prefix="/api/v1")
 app.include_router(todos.router, prefix="/api/v1")
 app.include_router(vodafone.router, prefix="/api/v1")
+app.include_router(reports.router, prefix="/api/v1")
+app.include_router(upload.router, prefix="/api/v1")
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from database.connection import SessionDep
+from database.models import User
+from utils.dependencies import get_current_admin_user
+
+router = APIRouter(prefix="/admin/reference-data", tags=["admin"])
+
+
+@router.post("/phonebook")
+def import_phonebook_file(
+    session: SessionDep,
+    file: UploadFile = File(...),
+    # A fájl a teljes telefonkönyv; a benne nem szereplő számok törlődnek.
+    # Ha ez minden meglévő számot törölne, az import 422-vel elutasítva
+    delete_missing: bool = False,
+    # Csak a változások összesítése, írás nélkül
+    dry_run: bool = False,
+    current_user: User = Depends(get_current_admin_user),
+):
+    # A pandas csak az első importnál töltődik be, nem az alkalmazás indulásakor
+    from services.reference_import import (
+        PHONEBOOK_COLUMNS,
+        ImportValidationError,
+        import_phonebook,
+        read_table,
+    )
+
+    try:
+        df = read_table(file.file, file.filename, PHONEBOOK_COLUMNS)
+        return import_phonebook(session, df, delete_missing, dry_run)
+    except ImportValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors)
+
+
+@router.post("/teszor-mappings")
+def import_teszor_mappings_file(
+    session: SessionDep,
+    file: UploadFile = File(...),
+    delete_missing: bool = False,
+    dry_run: bool = False,
+    current_user: User = Depends(get_current_admin_user),
+):
+    from services.reference_import import (
+        MAPPING_COLUMNS,
+        ImportValidationError,
+        import_teszor_mappings,
+        read_table,
+    )
+
+    try:
+        df = read_table(file.file, file.filename, MAPPING_COLUMNS)
+        return import_teszor_mappings(session, df, delete_missing, dry_run)
+    except ImportValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors)
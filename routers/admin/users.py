@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends
-from database.connection import SessionDep
+from database.connection import AsyncSessionDep
 from database.models import User, UserRead
 from sqlmodel import select
 from typing import List
@@ -9,11 +9,11 @@ router = APIRouter(prefix="/admin/users", tags=["admin"])
 
 
 @router.get("/", response_model=List[UserRead])
-def get_all_users(
-    session: SessionDep, current_user: User = Depends(get_current_admin_user)
+async def get_all_users(
+    session: AsyncSessionDep, current_user: User = Depends(get_current_admin_user)
 ):
     statement = select(User).where(User.id != current_user.id)
-    users = session.exec(statement).all()
+    users = (await session.exec(statement)).all()
 
     return [
         UserRead(
@@ -1,10 +1,22 @@
-from fastapi import APIRouter, status, HTTPException, Depends
+from fastapi import APIRouter, status, HTTPException, Depends, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.exc import OperationalError
 from database.models import User, UserCreate, UserRead, Token, TokenWithUser
-from database.connection import SessionDep
+from database.connection import AsyncSessionDep
 from sqlmodel import select
 from utils.hashing import Hash
+from services.principal_cache import principal_claims
+from services.password_executor import (
+    PASSWORD_HASH_RETRY_AFTER_SECONDS,
+    PasswordHashBusy,
+    get_password_executor,
+)
+from services.login_attempts import (
+    LOGIN_MAX_ATTEMPTS_PER_IP,
+    LOGIN_MAX_FAILURES_PER_USERNAME,
+    client_address,
+    login_attempts,
+)
 from datetime import datetime, timezone
 from typing import Annotated
 from .oauth2 import create_access_token, get_current_user
@@ -12,14 +24,55 @@ from .oauth2 import create_access_token, get_current_user
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 
+def check_attempts(key: str, limit: int):
+    retry_after = login_attempts.retry_after(key, limit)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts, please try again later.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+def check_client(http_request: Request):
+    # IP címenkénti korlát, ha be van kapcsolva; a próbálkozás azonnal számít
+    if not LOGIN_MAX_ATTEMPTS_PER_IP:
+        return
+    address = client_address(
+        http_request.client.host if http_request.client else None,
+        http_request.headers.get("x-forwarded-for"),
+    )
+    ip_key = f"ip:{address}"
+    check_attempts(ip_key, LOGIN_MAX_ATTEMPTS_PER_IP)
+    login_attempts.record(ip_key)
+
+
+async def run_password_hash(func, *args):
+    # a bcrypt CPU-igényes: saját, korlátos szálkészleten fut, nem a közös threadpoolon
+    try:
+        return await get_password_executor().run(func, *args)
+    except PasswordHashBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many logins are being processed, please try again soon.",
+            headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+        )
+
+
 @router.post("/register", status_code=status.HTTP_201_CREATED, response_model=UserRead)
-def create_user(user: UserCreate, session: SessionDep):
+async def create_user(
+    user: UserCreate, session: AsyncSessionDep, http_request: Request
+):
+    check_client(http_request)
+
     statement = select(User).where(User.username == user.username)
-    existing_user = session.exec(statement).first()
+    existing_user = (await session.exec(statement)).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already exists")
+    # A kapcsolat a hash idejére visszamegy a poolba
+    await session.commit()
 
-    hashed_password = Hash.bcrypt(user.password)
+    hashed_password = await run_password_hash(Hash.bcrypt, user.password)
 
     db_user = User(
         username=user.username,
@@ -28,8 +81,8 @@ def create_user(user: UserCreate, session: SessionDep):
     )
 
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+    await session.commit()
+    await session.refresh(db_user)
 
     return UserRead(
         id=db_user.id,
@@ -40,13 +93,19 @@ def create_user(user: UserCreate, session: SessionDep):
 
 
 @router.post("/login", response_model=TokenWithUser)
-def login(
+async def login(
     request: Annotated[OAuth2PasswordRequestForm, Depends()],
-    session: SessionDep,
+    session: AsyncSessionDep,
+    http_request: Request,
 ):
+    # A korlátok a jelszó-ellenőrzés előtt, hogy a túl sok próbálkozás ne vigyen CPU-t
+    user_key = f"user:{request.username}"
+    check_attempts(user_key, LOGIN_MAX_FAILURES_PER_USERNAME)
+    check_client(http_request)
+
     try:
         statement = select(User).where(User.username == request.username)
-        user = session.exec(statement).first()
+        user = (await session.exec(statement)).first()
     except OperationalError:
         # Adatbázis hiba (pl. Azure DB alszik vagy hálózati gond)
         raise HTTPException(
@@ -55,20 +114,36 @@ def login(
         )
 
     if not user:
+        login_attempts.record(user_key)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    if not Hash.verify(user.hashed_password, request.password):
+    # A kapcsolat a jelszó-ellenőrzés idejére visszamegy a poolba; egy belépési
+    # hullám így nem foglalja le a többi végpont elől
+    await session.commit()
+
+    verified, new_hash = await run_password_hash(
+        Hash.verify_and_update, user.hashed_password, request.password
+    )
+    if not verified:
+        login_attempts.record(user_key)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    login_attempts.reset(user_key)
+
+    if new_hash:
+        # Elavult munkafaktor (BCRYPT_ROUNDS változott): a hash most frissül
+        user.hashed_password = new_hash
+        session.add(user)
+        await session.commit()
 
-    access_token = create_access_token(data={"username": user.username})
+    access_token = create_access_token(data=principal_claims(user))
 
     return TokenWithUser(
         access_token=access_token,
@@ -83,5 +158,5 @@ def login(
 
 
 @router.get("/me")
-def read_users_me(current_user: Annotated[UserRead, Depends(get_current_user)]):
+async def read_users_me(current_user: Annotated[UserRead, Depends(get_current_user)]):
     return current_user
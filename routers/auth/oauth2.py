@@ -1,8 +1,14 @@
 from fastapi import HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import select
-from database.connection import SessionDep
-from database.models import TokenData, User, UserRead
+from database.connection import AsyncSessionDep
+from database.models import User, UserRead
+from services.principal_cache import (
+    principal_cache,
+    principal_from_claims,
+    principal_version,
+)
+from services.token_cache import verified_token_cache
 from datetime import datetime, timezone, timedelta
 from jose import JWTError, jwt
 import os
@@ -23,16 +29,65 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 def create_access_token(data: dict):
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=access_token_expire_minutes)
+    now = datetime.now(timezone.utc)
+    expire = now + timedelta(minutes=access_token_expire_minutes)
 
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": now})
     encoded_jwt = jwt.encode(to_encode, secret_key, algorithm=algorithm)
     return encoded_jwt
 
 
-def get_current_user(
+def verified_claims(token: str) -> dict:
+    """A token claimjei; az aláírást csak az első alkalommal ellenőrzi.
+
+    Érvénytelen tokennél JWTError. Ugyanaz a token a lejáratáig a
+    verified_token_cache-ből jön, jwt.decode nélkül.
+    """
+    payload = verified_token_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, secret_key, algorithms=[algorithm])
+        verified_token_cache.put(token, payload)
+    return payload
+
+
+async def resolve_principal(session, payload: dict) -> UserRead | None:
+    """A token tulajdonosa, lehetőleg adatbázis nélkül.
+
+    Sorrend: friss token claimjei, principal cache, végül egy lekérdezés.
+    Ha a token verziója már nem egyezik a felhasználóéval (szerep- vagy
+    jelszóváltozás óta adták ki), None.
+    """
+    principal = principal_from_claims(payload)
+    if principal is not None:
+        return principal
+
+    username = payload["username"]
+    version = payload.get("ver")
+    principal = principal_cache.get(username, version)
+    if principal is not None:
+        return principal
+
+    statement = select(User).where(User.username == username)
+    user = (await session.exec(statement)).first()
+
+    if user is None:
+        return None
+    if version is not None and version != principal_version(user):
+        return None
+
+    principal = UserRead(
+        id=user.id,
+        username=user.username,
+        role=user.role,
+        created_at=user.created_at,
+    )
+    principal_cache.put(username, version, principal)
+    return principal
+
+
+async def get_current_user(
     request: Request,
-    session: SessionDep,
+    session: AsyncSessionDep,
 ):
 
     credentials_exception = HTTPException(
@@ -47,32 +102,25 @@ def get_current_user(
         raise credentials_exception
 
     try:
-        payload = jwt.decode(token, secret_key, algorithms=[algorithm])
+        payload = verified_claims(token)
         username = payload.get("username")
 
         if username is None:
             raise credentials_exception
-        token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
 
-    statement = select(User).where(User.username == token_data.username)
-    user = session.exec(statement).first()
+    principal = await resolve_principal(session, payload)
 
-    if user is None:
+    if principal is None:
         raise credentials_exception
 
-    return UserRead(
-        id=user.id,
-        username=user.username,
-        role=user.role,
-        created_at=user.created_at,
-    )
+    return principal
 
 
-def verify_token(token: str):
+def decode_token(token: str) -> dict:
     try:
-        payload = jwt.decode(token, secret_key, algorithms=[algorithm])
+        payload = verified_claims(token)
         username: str = payload.get("username")
         if username is None:
             raise HTTPException(
@@ -80,10 +128,14 @@ def verify_token(token: str):
                 detail="Invalid token",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        return username
+        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+
+def verify_token(token: str):
+    return decode_token(token)["username"]
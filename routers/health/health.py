@@ -0,0 +1,32 @@
+import time
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+from sqlmodel import text
+from database.connection import TRANSIENT_ERRORS, async_engine, engine, pool_status
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/db")
+def get_db_health():
+    # Saját kapcsolat a poolból, újrapróbálás nélkül: a valós állapotot mutassa
+    started = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except TRANSIENT_ERRORS as e:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={
+                "status": "unavailable",
+                "error": str(e.orig or e)[:500],
+                **pool_status(),
+            },
+        )
+
+    return {
+        "status": "ok",
+        "connect_ms": round((time.perf_counter() - started) * 1000, 2),
+        **pool_status(),
+        "async_pool": pool_status(async_engine.pool),
+    }
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Annotated, Literal
+from database.connection import SessionDep
+from database.models import User
+from routers.auth.oauth2 import get_current_user
+from services.invoice_reports import invoice_report_cache
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+PERIOD_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+
+@router.get("/invoice-costs")
+def get_invoice_costs(
+    current_user: Annotated[User, Depends(get_current_user)],
+    session: SessionDep,
+    group_by: Literal["employee", "phone_number", "ledger_account", "vat_code"],
+    from_period: str | None = Query(None, pattern=PERIOD_PATTERN),
+    to_period: str | None = Query(None, pattern=PERIOD_PATTERN),
+    # Havi bontás: minden csoport időszakonként külön sorban
+    monthly: bool = False,
+):
+    if from_period and to_period and from_period > to_period:
+        raise HTTPException(
+            status_code=400, detail="from_period must not be after to_period"
+        )
+
+    rows = invoice_report_cache.report(
+        session, group_by, from_period, to_period, monthly
+    )
+    return {
+        "group_by": group_by,
+        "from_period": from_period,
+        "to_period": to_period,
+        "rows": rows,
+    }
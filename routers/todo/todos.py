@@ -1,64 +1,46 @@
 from typing import Annotated
 from fastapi import APIRouter, Depends, status, HTTPException, Response
 from fastapi.responses import StreamingResponse
-from io import BytesIO
-import pandas as pd
 from routers.auth.oauth2 import get_current_user
 from database.models import Todo, TodoCreate, TodoUpdate, User
-from database.connection import SessionDep
-from sqlmodel import select, func, case
+from database.connection import AsyncSessionDep
 from datetime import datetime, timezone, timedelta
 from zoneinfo import ZoneInfo
 from collections import defaultdict
+from services.xlsx_export import XLSX_MEDIA_TYPE, stream_workbook
+from services.todo_queries import (
+    category_counts_query,
+    done_between_query,
+    due_between_query,
+    todos_count_query,
+    todos_query,
+    upcoming_query,
+)
 
 router = APIRouter(prefix="/todo", tags=["todo"])
 
 
 @router.get("/all")
-def get_todos(
+async def get_todos(
     current_user: Annotated[User, Depends(get_current_user)],
-    session: SessionDep,
+    session: AsyncSessionDep,
     category: str | None = None,
     status: str | None = None,
 ):
 
-    base_query = select(Todo).where(
-        Todo.user_id == current_user.id, Todo.category == category
-    )
-
-    count_query = select(func.count()).where(
-        Todo.user_id == current_user.id, Todo.category == category
-    )
-
-    all_todos_count = session.exec(count_query).one()
-
-    # Kategória szűrés (opcionális)
-    if category:
-        base_query = base_query.where(Todo.category == category)
-        count_query = count_query.where(Todo.category == category)
+    count_query = todos_count_query(current_user.id, category)
+    filtered_query = todos_query(current_user.id, category, status)
 
-    # Státusz szűrés (opcionális)
-    if status:
-        base_query = base_query.where(Todo.status == status)
-
-    # Rendezés (SQL Server-kompatibilis!)
-    filtered_query = base_query.order_by(
-        case((Todo.status == "done", 1), else_=0),
-        case((Todo.deadline.is_(None), 1), else_=0),
-        Todo.deadline.asc(),
-        Todo.created_at.asc(),
-    )
-
-    all_todos_count = session.exec(count_query).one()
-    filtered_todos = session.exec(filtered_query).all()
+    all_todos_count = (await session.exec(count_query)).one()
+    filtered_todos = (await session.exec(filtered_query)).all()
 
     return {"all_count": all_todos_count, "filtered": filtered_todos}
 
 
 @router.get("/upcoming")
-def get_upcoming_todos(
+async def get_upcoming_todos(
     current_user: Annotated[User, Depends(get_current_user)],
-    session: SessionDep,
+    session: AsyncSessionDep,
 ):
     HU_TZ = ZoneInfo("Europe/Budapest")
     now_local = datetime.now(HU_TZ)
@@ -76,18 +58,8 @@ def get_upcoming_todos(
     today_start = datetime.combine(today, datetime.min.time())
     end_of_week = datetime.combine(end_of_week_date, datetime.max.time())
 
-    query = (
-        select(Todo)
-        .where(
-            Todo.user_id == current_user.id,
-            Todo.deadline >= today_start,
-            Todo.deadline <= end_of_week,
-            Todo.status != "done",
-        )
-        .order_by(Todo.deadline.asc())
-    )
-
-    todos = session.exec(query).all()
+    query = upcoming_query(current_user.id, today_start, end_of_week)
+    todos = (await session.exec(query)).all()
 
     grouped_todos = {"today": [], "tomorrow": [], "this_week": []}
 
@@ -108,12 +80,7 @@ def get_upcoming_todos(
             grouped_todos["this_week"].append(todo)
 
     # Stats lekérdezés
-    query = (
-        select(Todo.category, func.count(Todo.id).label("count"))
-        .where(Todo.user_id == current_user.id)
-        .group_by(Todo.category)
-    )
-    stats_results = session.exec(query).all()
+    stats_results = (await session.exec(category_counts_query(current_user.id))).all()
 
     stats = {"personal": 0, "work": 0, "development": 0}
 
@@ -132,18 +99,12 @@ def get_upcoming_todos(
 
 
 @router.get("/stats")
-def get_todo_stats(
+async def get_todo_stats(
     current_user: Annotated[User, Depends(get_current_user)],
-    session: SessionDep,
+    session: AsyncSessionDep,
 ):
     # SQL query a kategóriánkénti csoportosításhoz
-    query = (
-        select(Todo.category, func.count(Todo.id).label("count"))
-        .where(Todo.user_id == current_user.id)
-        .group_by(Todo.category)
-    )
-
-    results = session.exec(query).all()
+    results = (await session.exec(category_counts_query(current_user.id))).all()
 
     # Alapértelmezett értékek minden kategóriához
     stats = {"personal": 0, "work": 0, "development": 0, "total": 0}
@@ -162,28 +123,18 @@ def get_todo_stats(
 
 
 @router.get("/daily")
-def get_todays_todos(
-    current_user: Annotated[User, Depends(get_current_user)], session: SessionDep
+async def get_todays_todos(
+    current_user: Annotated[User, Depends(get_current_user)], session: AsyncSessionDep
 ):
     now = datetime.now(timezone.utc)
     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
     today_end = today_start + timedelta(days=1)
 
-    done_stmt = select(Todo).where(
-        Todo.user_id == current_user.id,
-        Todo.status == "done",
-        Todo.completed_at >= today_start,
-        Todo.completed_at < today_end,
-    )
-    done_todos = session.exec(done_stmt).all()
+    done_stmt = done_between_query(current_user.id, today_start, today_end)
+    done_todos = (await session.exec(done_stmt)).all()
 
-    due_stmt = select(Todo).where(
-        Todo.user_id == current_user.id,
-        Todo.status != "done",
-        Todo.deadline >= today_start,
-        Todo.deadline < today_end,
-    )
-    due_todos = session.exec(due_stmt).all()
+    due_stmt = due_between_query(current_user.id, today_start, today_end)
+    due_todos = (await session.exec(due_stmt)).all()
 
     def group_by_category(todos):
         grouped = defaultdict(list)
@@ -201,85 +152,73 @@ def get_todays_todos(
     }
 
 
+EXPORT_COLUMNS = [
+    "Title",
+    "Description",
+    "Category",
+    "Deadline",
+    "Completed At",
+    "Status",
+]
+
+
+def export_category(todo: Todo) -> str:
+    return str(todo.category).split(".")[-1]
+
+
+def todos_to_rows(todos):
+    if not todos:
+        # Üres lap alapértelmezett sorral
+        yield [""] * len(EXPORT_COLUMNS)
+        return
+    for todo in todos:
+        yield (
+            todo.title,
+            todo.description,
+            export_category(todo),
+            todo.deadline,
+            todo.completed_at,
+            str(todo.status).split(".")[-1],
+        )
+
+
 @router.get("/daily/export")
-def get_todays_todos(
-    current_user: Annotated[User, Depends(get_current_user)], session: SessionDep
+async def get_todays_todos(
+    current_user: Annotated[User, Depends(get_current_user)], session: AsyncSessionDep
 ):
     now = datetime.now(timezone.utc)
     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
     today_end = today_start + timedelta(days=1)
 
-    done_stmt = select(Todo).where(
-        Todo.user_id == current_user.id,
-        Todo.status == "done",
-        Todo.completed_at >= today_start,
-        Todo.completed_at < today_end,
-    )
-    done_todos = session.exec(done_stmt).all()
-
-    due_stmt = select(Todo).where(
-        Todo.user_id == current_user.id,
-        Todo.status != "done",
-        Todo.deadline >= today_start,
-        Todo.deadline < today_end,
-    )
-    due_todos = session.exec(due_stmt).all()
-
-    # Átalakítás DataFrame-é
-    def todos_to_df(todos):
-        if not todos:
-            # Üres DataFrame alapértelmezett sorral
-            return pd.DataFrame(
-                {
-                    "Title": [""],
-                    "Description": [""],
-                    "Category": [""],
-                    "Deadline": [""],
-                    "Completed At": [""],
-                    "Status": [""],
-                }
-            )
-        return pd.DataFrame(
-            [
-                {
-                    "Title": todo.title,
-                    "Description": todo.description,
-                    "Category": str(todo.category).split(".")[-1],
-                    "Deadline": todo.deadline,
-                    "Completed At": todo.completed_at,
-                    "Status": str(todo.status).split(".")[-1],
-                }
-                for todo in todos
-            ]
-        )
-
-    df_done = todos_to_df(done_todos)
-    df_due = todos_to_df(due_todos)
+    done_stmt = done_between_query(current_user.id, today_start, today_end)
+    done_todos = (await session.exec(done_stmt)).all()
 
-    # Írás Excel fájlba (memóriában)
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df_done.to_excel(writer, sheet_name="Completed Today", index=False)
-        df_due.to_excel(writer, sheet_name="Due Today", index=False)
+    due_stmt = due_between_query(current_user.id, today_start, today_end)
+    due_todos = (await session.exec(due_stmt)).all()
 
-    output.seek(0)
-    # excel_data = output.getvalue()
+    # Excel lapok soronként, a teljes fájl felépítése nélkül
+    done_rows = todos_to_rows(done_todos)
+    due_rows = todos_to_rows(due_todos)
+    sheets = [
+        ("Completed Today", EXPORT_COLUMNS, done_rows),
+        ("Due Today", EXPORT_COLUMNS, due_rows),
+    ]
 
     filename = f"daily_report_{now.date()}.xlsx"
 
     return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        stream_workbook(sheets),
+        media_type=XLSX_MEDIA_TYPE,
         headers={
             "Content-Disposition": f"attachment; filename={filename}",
-            "Content-Type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            "Content-Type": XLSX_MEDIA_TYPE,
         },
     )
 
 
 @router.get("/weekly/export")
-def get_todays_todos(
-    current_user: Annotated[User, Depends(get_current_user)], session: SessionDep
+async def get_todays_todos(
+    current_user: Annotated[User, Depends(get_current_user)], session: AsyncSessionDep
 ):
     now = datetime.now(timezone.utc)
 
@@ -290,78 +229,35 @@ def get_todays_todos(
     # Hét vége (vasárnap 23:59:59)
     week_end = week_start + timedelta(days=7)
 
-    done_stmt = select(Todo).where(
-        Todo.user_id == current_user.id,
-        Todo.status == "done",
-        Todo.completed_at >= week_start,
-        Todo.completed_at < week_end,
-    )
-    done_todos = session.exec(done_stmt).all()
-
-    due_stmt = select(Todo).where(
-        Todo.user_id == current_user.id,
-        Todo.status != "done",
-        Todo.deadline >= week_start,
-        Todo.deadline < week_end,
-    )
-    due_todos = session.exec(due_stmt).all()
-
-    # Átalakítás DataFrame-é
-    def todos_to_df(todos):
-        if not todos:
-            # Üres DataFrame alapértelmezett sorral
-            return pd.DataFrame(
-                {
-                    "Title": [""],
-                    "Description": [""],
-                    "Category": [""],
-                    "Deadline": [""],
-                    "Completed At": [""],
-                    "Status": [""],
-                }
-            )
-        df = pd.DataFrame(
-            [
-                {
-                    "Title": todo.title,
-                    "Description": todo.description,
-                    "Category": str(todo.category).split(".")[-1],
-                    "Deadline": todo.deadline,
-                    "Completed At": todo.completed_at,
-                    "Status": str(todo.status).split(".")[-1],
-                }
-                for todo in todos
-            ]
-        )
-        return df.sort_values(["Category"])
+    done_stmt = done_between_query(current_user.id, week_start, week_end)
+    done_todos = (await session.exec(done_stmt)).all()
 
-    df_done = todos_to_df(done_todos)
-    df_due = todos_to_df(due_todos)
+    due_stmt = due_between_query(current_user.id, week_start, week_end)
+    due_todos = (await session.exec(due_stmt)).all()
 
-    # Írás Excel fájlba (memóriában)
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df_done.to_excel(writer, sheet_name="Completed This Week", index=False)
-        df_due.to_excel(writer, sheet_name="Due This Week", index=False)
-
-    output.seek(0)
-    # excel_data = output.getvalue()
+    # Excel lapok soronként, kategória szerint rendezve
+    done_rows = todos_to_rows(sorted(done_todos, key=export_category))
+    due_rows = todos_to_rows(sorted(due_todos, key=export_category))
+    sheets = [
+        ("Completed This Week", EXPORT_COLUMNS, done_rows),
+        ("Due This Week", EXPORT_COLUMNS, due_rows),
+    ]
 
     filename = f"weekly_report_{now.date()}.xlsx"
 
     return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        stream_workbook(sheets),
+        media_type=XLSX_MEDIA_TYPE,
         headers={
             "Content-Disposition": f"attachment; filename={filename}",
-            "Content-Type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            "Content-Type": XLSX_MEDIA_TYPE,
         },
     )
 
 
 @router.get("/weekly")
-def get_todays_todos(
-    current_user: Annotated[User, Depends(get_current_user)], session: SessionDep
+async def get_todays_todos(
+    current_user: Annotated[User, Depends(get_current_user)], session: AsyncSessionDep
 ):
     now = datetime.now(timezone.utc)
 
@@ -372,21 +268,11 @@ def get_todays_todos(
     # Hét vége (vasárnap 23:59:59)
     week_end = week_start + timedelta(days=7)
 
-    done_stmt = select(Todo).where(
-        Todo.user_id == current_user.id,
-        Todo.status == "done",
-        Todo.completed_at >= week_start,
-        Todo.completed_at < week_end,
-    )
-    done_todos = session.exec(done_stmt).all()
+    done_stmt = done_between_query(current_user.id, week_start, week_end)
+    done_todos = (await session.exec(done_stmt)).all()
 
-    due_stmt = select(Todo).where(
-        Todo.user_id == current_user.id,
-        Todo.status != "done",
-        Todo.deadline >= week_start,
-        Todo.deadline < week_end,
-    )
-    due_todos = session.exec(due_stmt).all()
+    due_stmt = due_between_query(current_user.id, week_start, week_end)
+    due_todos = (await session.exec(due_stmt)).all()
 
     def group_by_category(todos):
         grouped = defaultdict(list)
@@ -405,10 +291,10 @@ def get_todays_todos(
 
 
 @router.post("/create", status_code=status.HTTP_201_CREATED)
-def create_todo(
+async def create_todo(
     todo: TodoCreate,
     current_user: Annotated[User, Depends(get_current_user)],
-    session: SessionDep,
+    session: AsyncSessionDep,
 ):
     todo_data = todo.model_dump()
 
@@ -419,19 +305,19 @@ def create_todo(
     db_todo = Todo(**todo_data, user_id=current_user.id, completed_at=completed_at)
 
     session.add(db_todo)
-    session.commit()
-    session.refresh(db_todo)
+    await session.commit()
+    await session.refresh(db_todo)
     return db_todo
 
 
 @router.patch("/{todo_id}")
-def update_todo(
+async def update_todo(
     todo_id: int,
     todo_update: TodoUpdate,
     current_user: Annotated[User, Depends(get_current_user)],
-    session: SessionDep,
+    session: AsyncSessionDep,
 ):
-    db_todo = session.get(Todo, todo_id)
+    db_todo = await session.get(Todo, todo_id)
 
     if not db_todo or db_todo.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Todo not found")
@@ -451,20 +337,20 @@ def update_todo(
     db_todo.modified_at = datetime.now(timezone.utc)
 
     session.add(db_todo)
-    session.commit()
-    session.refresh(db_todo)
+    await session.commit()
+    await session.refresh(db_todo)
     return db_todo
 
 
 @router.delete("/{todo_id}")
-def delete_todo(
+async def delete_todo(
     todo_id: int,
     current_user: Annotated[User, Depends(get_current_user)],
-    session: SessionDep,
+    session: AsyncSessionDep,
 ):
-    todo = session.get(Todo, todo_id)
+    todo = await session.get(Todo, todo_id)
     if not todo or todo.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Todo not found")
-    session.delete(todo)
-    session.commit()
+    await session.delete(todo)
+    await session.commit()
     return {"ok": True}
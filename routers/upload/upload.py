@@ -1,204 +1,277 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
-from fastapi.responses import StreamingResponse
-import base64
-from sqlmodel import select
-from sqlalchemy.orm import selectinload
-from azure.communication.email import EmailClient
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query
+from typing import List, Literal
+from fastapi.responses import StreamingResponse, FileResponse, Response
+from functools import cache
 import os
-import io
 from database.connection import SessionDep
-from database.models import (
-    User,
-    PhoneBook,
-    TeszorMapping,
-    TeszorCode,
-    LedgerAccount,
-    VatSetting,
-)
+from database.models import User, InvoiceJob, InvoiceJobRead, JobStatus
 from typing import Annotated
 from routers.auth.oauth2 import get_current_user
-import pandas as pd
-from services.invoice_processor import InvoiceProcessor
-import re
+from services.xlsx_export import XLSX_MEDIA_TYPE
+from services.reference_data import get_reference_data
+from services.invoice_store import store_invoice
+from services.upload_spool import UPLOAD_MAX_BYTES, UploadTooLarge, spool_upload
+
+# A PDF feldolgozás (pdfplumber, pypdfium2), a pandas és az Azure SDK betöltése
+# lassú, ezért ezek a modulok csak az őket használó végpont első hívásakor töltődnek be
 
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 
-email_client = EmailClient.from_connection_string(
-    os.getenv("AZURE_EMAIL_CONNECTION_STRING")
-)
+
+@cache
+def get_email_client():
+    from azure.communication.email import EmailClient
+
+    return EmailClient.from_connection_string(
+        os.getenv("AZURE_EMAIL_CONNECTION_STRING")
+    )
+
+
+@router.get("/vodafone/cache")
+def get_parse_cache_stats(current_user: Annotated[User, Depends(get_current_user)]):
+    from services.parse_cache import parse_cache
+
+    return parse_cache.stats()
+
+
+@router.post("/jobs", status_code=202)
+def create_upload_job(
+    current_user: Annotated[User, Depends(get_current_user)],
+    file: UploadFile = File(...),
+):
+    from services.invoice_jobs import QueueFull, get_job_queue
+
+    if file.content_type != "application/pdf":
+        raise HTTPException(status_code=400, detail="A feltöltött fájl nem PDF.")
+
+    try:
+        job = get_job_queue().submit(file.filename, file.file)
+    except UploadTooLarge:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A feltöltött fájl legfeljebb {UPLOAD_MAX_BYTES} bájt lehet.",
+        )
+    except QueueFull:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many invoices are being processed, please try again later.",
+            headers={"Retry-After": "30"},
+        )
+
+    return {"job_id": job.id, "status": job.status}
+
+
+@router.get("/jobs/{job_id}", response_model=InvoiceJobRead)
+def get_upload_job(
+    job_id: str,
+    session: SessionDep,
+    current_user: Annotated[User, Depends(get_current_user)],
+):
+    job = session.get(InvoiceJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/result")
+def get_upload_job_result(
+    job_id: str,
+    session: SessionDep,
+    current_user: Annotated[User, Depends(get_current_user)],
+):
+    from services.invoice_jobs import result_path
+
+    job = session.get(InvoiceJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != JobStatus.done:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status.value}")
+    if not os.path.exists(result_path(job_id)):
+        raise HTTPException(status_code=410, detail="Job result is no longer available")
+
+    return FileResponse(
+        result_path(job_id),
+        media_type=XLSX_MEDIA_TYPE,
+        filename="invoice_data.xlsx",
+    )
+
+
+@router.post("/vodafone/batch")
+def upload_batch(
+    current_user: Annotated[User, Depends(get_current_user)],
+    session: SessionDep,
+    files: List[UploadFile] = File(...),
+    # Elszámolási hónap a mentett számlákhoz ("YYYY-MM"), alapból az aktuális hónap
+    period: str | None = Form(None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$"),
+):
+    from services.invoice_batch import (
+        BATCH_MAX_FILES,
+        BATCH_MAX_TOTAL_BYTES,
+        BatchTooLarge,
+        expand_uploads,
+        parse_batch,
+    )
+    from services.invoice_workbook import build_batch_workbook
+    from services.upload_executor import (
+        UPLOAD_RETRY_AFTER_SECONDS,
+        get_upload_executor,
+    )
+
+    try:
+        pdfs, failures = expand_uploads([(f.filename, f.file) for f in files])
+    except BatchTooLarge:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A feltöltött PDF-ek együtt legfeljebb {BATCH_MAX_TOTAL_BYTES} bájtot foglalhatnak.",
+        )
+
+    if not pdfs:
+        raise HTTPException(status_code=400, detail="Nincs feldolgozható PDF.")
+    if len(pdfs) > BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Legfeljebb {BATCH_MAX_FILES} számla tölthető fel egyszerre.",
+        )
+
+    # A köteg az egyedi feltöltésekkel közös folyamatkészleten és befogadási korláton osztozik
+    executor = get_upload_executor()
+    if not executor.try_admit():
+        raise HTTPException(
+            status_code=503,
+            detail="Too many invoices are being processed, please try again later.",
+            headers={"Retry-After": str(UPLOAD_RETRY_AFTER_SECONDS)},
+        )
+    try:
+        results, parse_failures = parse_batch(pdfs, session, period)
+    finally:
+        executor.release()
+    failures.extend(parse_failures)
+
+    if not results:
+        raise HTTPException(
+            status_code=422,
+            detail=[{"file": name, "error": error} for name, error in failures],
+        )
+
+    workbook = build_batch_workbook(results, failures, get_reference_data(session))
+
+    return StreamingResponse(
+        workbook,
+        media_type=XLSX_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": "attachment; filename=invoice_batch.xlsx",
+            "X-Failed-Files": str(len(failures)),
+        },
+    )
+
+
+def invoice_response(result: dict, reference: dict, output_format: str, table: str):
+    from services.invoice_workbook import build_workbook
+    from services.invoice_export import (
+        EXPORT_MEDIA_TYPES,
+        invoice_tables,
+        parquet_bytes,
+        stream_csv,
+        stream_ndjson,
+    )
+
+    if output_format == "xlsx":
+        return StreamingResponse(
+            build_workbook(result, reference),
+            media_type=XLSX_MEDIA_TYPE,
+            headers={"Content-Disposition": "attachment; filename=invoice_data.xlsx"},
+        )
+
+    tables = invoice_tables(result, reference)
+    media_type = EXPORT_MEDIA_TYPES[output_format]
+
+    if output_format == "parquet":
+        return Response(
+            parquet_bytes(tables[table]),
+            media_type=media_type,
+            headers={"Content-Disposition": f"attachment; filename={table}.parquet"},
+        )
+    if output_format == "csv":
+        return StreamingResponse(
+            stream_csv(tables[table]),
+            media_type=media_type,
+            headers={"Content-Disposition": f"attachment; filename={table}.csv"},
+        )
+    # ndjson: mindkét tábla, soronként jelölve
+    return StreamingResponse(
+        stream_ndjson(tables),
+        media_type=media_type,
+        headers={"Content-Disposition": "attachment; filename=invoice_data.ndjson"},
+    )
 
 
 @router.post("/vodafone")
 async def upload(
-    # current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[User, Depends(get_current_user)],
     session: SessionDep,
     file: UploadFile = File(...),
     # email: str = Form(...),
+    output_format: Literal["xlsx", "ndjson", "csv", "parquet"] = Query(
+        "xlsx", alias="format"
+    ),
+    # csv és parquet esetén egy fájl egy tábla
+    table: Literal["service_charges", "invoice_summary"] = "service_charges",
+    # Elszámolási hónap a mentett számlához ("YYYY-MM"), alapból az aktuális hónap
+    period: str | None = Form(None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$"),
 ):
 
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="A feltöltött fájl nem PDF.")
 
-    file_bytes = await file.read()
-    file_base64 = base64.b64encode(file_bytes).decode("utf-8")
+    from services.upload_executor import (
+        UPLOAD_RETRY_AFTER_SECONDS,
+        get_upload_executor,
+    )
+
+    executor = get_upload_executor()
+    if not executor.try_admit():
+        raise HTTPException(
+            status_code=503,
+            detail="Too many invoices are being processed, please try again later.",
+            headers={"Retry-After": str(UPLOAD_RETRY_AFTER_SECONDS)},
+        )
 
     try:
-        processor = InvoiceProcessor(file_bytes)
-        result = processor.process()
-
-        if not result["invoice_summary"] and not result["service_charges"]:
-            raise HTTPException(
-                status_code=400, detail="No relevant invoice data found in the PDF."
-            )
+        # A PDF lemezre kerül, a feldolgozó folyamat onnan olvassa
+        spooled = await executor.run_blocking(spool_upload, file.file)
+        try:
+            result = await executor.parse(spooled.path, spooled.sha256)
+
+            if not result["invoice_summary"] and not result["service_charges"]:
+                raise HTTPException(
+                    status_code=400,
+                    detail="No relevant invoice data found in the PDF.",
+                )
 
-        # 🔹 Telefonszám → Tulajdonos betöltés (dict)
-        phone_user_map = {
-            row.phone_number: row.owner for row in session.exec(select(PhoneBook)).all()
-        }
-
-        teszor_mappings = session.exec(
-            select(TeszorMapping)
-            .join(TeszorCode)
-            .join(LedgerAccount)
-            .join(VatSetting)
-            .options(
-                selectinload(TeszorMapping.teszor_code),
-                selectinload(TeszorMapping.ledger_account),
-                selectinload(TeszorMapping.vat_setting),
+            invoice = await executor.run_blocking(
+                store_invoice, session, spooled.sha256, result, period, file.filename
             )
-        ).all()
-
-        teszor_category_map = {
-            mapping.teszor_code.teszor_code: mapping.ledger_account.title
-            for mapping in teszor_mappings
-            if mapping.teszor_code and mapping.ledger_account
-        }
-
-        mapping_lookup = {
-            (m.teszor_code.teszor_code, m.vat_setting.rate): {
-                "Title": m.ledger_account.title,
-                "VatCode": m.vat_setting.code,
-                "LedgerAccount": m.ledger_account.account_number,
-            }
-            for m in teszor_mappings
-            if m.teszor_code and m.vat_setting and m.ledger_account
-        }
-
-        def extract_mapping_info(row):
-            key = (row["TESZOR"], row["VATRate"])
-
-            return pd.Series(
-                mapping_lookup.get(
-                    key,
-                    {
-                        "Title": "Ismeretlen",
-                        "VatCode": "Ismeretlen",
-                        "LedgerAccount": "Ismeretlen",
-                    },
-                )
+            reference = await executor.run_blocking(get_reference_data, session)
+            response = await executor.run_blocking(
+                invoice_response, result, reference, output_format, table
             )
+        finally:
+            spooled.remove()
 
-        def _clean_float(value):
-            try:
-                cleaned = value.replace(".", "").replace(",", ".").strip()
-                return float(cleaned) if re.match(r"^-?\d+(\.\d+)?$", cleaned) else None
-            except Exception:
-                return None
-
-        excel_buffer = io.BytesIO()
-
-        with pd.ExcelWriter(excel_buffer, engine="openpyxl") as writer:
-            if result["invoice_summary"]:
-                # df_summary = pd.DataFrame(result["invoice_summary"])
-
-                df_summary = pd.DataFrame(
-                    result["invoice_summary"],
-                    columns=[
-                        "Megnevezés",
-                        "Mennyiség",
-                        "Mennyiségi egység",
-                        "Egységár (Ft)",
-                        "TESZOR szám",
-                        "ÁFA kulcs",
-                        "Nettó összeg (Ft)",
-                        "ÁFA összeg (Ft)",
-                        "Bruttó összeg (Ft)",
-                    ],
-                )
-
-                for col in [
-                    "Egységár (Ft)",
-                    "Nettó összeg (Ft)",
-                    "ÁFA összeg (Ft)",
-                    "Bruttó összeg (Ft)",
-                ]:
-                    df_summary[col] = (
-                        df_summary[col]
-                        .astype(str)
-                        .str.replace(".", "", regex=False)
-                        .str.replace(",", ".", regex=False)
-                        .astype(float)
-                    )
-
-                df_summary.to_excel(writer, sheet_name="InvoiceSummary", index=False)
-            # ---------------------------------------------------------------------------------------
-            if result["service_charges"]:
-                df_charges = pd.DataFrame(
-                    result["service_charges"],
-                    columns=[
-                        "PhoneNumber",
-                        "Description",
-                        "TESZOR",
-                        "TotalAmount",
-                        "VATAmount",
-                        "VATRate",
-                        "NetAmount",
-                    ],
-                )
-                df_charges["Employee"] = (
-                    df_charges["PhoneNumber"].map(phone_user_map).fillna("N/A")
-                )
-                df_charges["LedgerTitle"] = (
-                    df_charges["TESZOR"].map(teszor_category_map).fillna("N/A")
-                )
+        response.headers["X-Invoice-Id"] = str(invoice.id)
 
-                title_df = df_charges.apply(extract_mapping_info, axis=1)
-                df = pd.concat([df_charges, title_df], axis=1)
-
-                for col in ["NetAmount", "VATAmount", "TotalAmount"]:
-                    df[col] = df_charges[col].apply(_clean_float)
-                # ---------------------------------------------------------------------------------------
-                df.to_excel(writer, sheet_name="ServiceCharges", index=False)
-
-            if not df.empty:
-                pivot_df = pd.pivot_table(
-                    df,
-                    index=[
-                        "PhoneNumber",
-                        "Employee",
-                        "VATRate",
-                        "Title",
-                        "VatCode",
-                        "LedgerAccount",
-                    ],
-                    values=["NetAmount", "VATAmount"],
-                    aggfunc="sum",
-                    fill_value=0,
-                ).reset_index()
-
-                pivot_df.to_excel(writer, sheet_name="Kimutatás", index=False)
-
-        excel_buffer.seek(0)
+        return response
 
-        return StreamingResponse(
-            excel_buffer,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": "attachment; filename=invoice_data.xlsx"},
+    except UploadTooLarge:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A feltöltött fájl legfeljebb {UPLOAD_MAX_BYTES} bájt lehet.",
         )
-
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
+    finally:
+        executor.release()
 
     message = {
         "content": {
@@ -224,7 +297,8 @@ async def upload(
             {
                 "name": file.filename,
                 "contentType": "application/pdf",
-                "contentInBase64": file_base64,
+                # base64 csak küldéskor, a lemezen lévő PDF-ből
+                "contentInBase64": spooled.to_base64(),
             }
         ],
     }
@@ -235,7 +309,7 @@ async def upload(
         "data": {},
     }
     # try:
-    #     poller = email_client.begin_send(message)
+    #     poller = get_email_client().begin_send(message)
     #     result = poller.result()
 
     #     if result["status"] == "Succeeded":
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, status, HTTPException, Response
 from typing import Annotated
 from database.connection import SessionDep
-from database.models import PhoneBook, LedgerAccount, VatSetting, User, TeszorCode
+from database.models import User
 from routers.auth.oauth2 import get_current_user
-from sqlmodel import select, func, case
+from services.reference_data import get_reference_data
 
 
 router = APIRouter(prefix="/vodafone", tags=["vodafone"])
@@ -14,14 +14,4 @@ def get_extraction_support_data(
     # current_user: Annotated[User, Depends(get_current_user)],
     session: SessionDep,
 ):
-    phonebook = session.exec(select(PhoneBook)).all()
-    ledger_accounts = session.exec(select(LedgerAccount)).all()
-    vat_settings = session.exec(select(VatSetting)).all()
-    teszor_codes = session.exec(select(TeszorCode)).all()
-
-    return {
-        "phonebook": phonebook,
-        "ledger_accounts": ledger_accounts,
-        "vat_settings": vat_settings,
-        "teszor_codes": teszor_codes,
-    }
+    return get_reference_data(session)["extraction_support"]
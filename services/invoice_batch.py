@@ -0,0 +1,114 @@
+import hashlib
+import os
+import zipfile
+
+from sqlmodel import Session
+
+from services.invoice_store import store_invoice
+from services.parse_cache import process_invoice
+from services.upload_executor import get_upload_executor
+from services.upload_spool import UPLOAD_MAX_BYTES
+
+BATCH_MAX_FILES = int(os.getenv("INVOICE_BATCH_MAX_FILES", "50"))
+# A köteg PDF-jei (a kibontott ZIP elemekkel együtt) összesen legfeljebb ennyi bájtot foglalhatnak
+BATCH_MAX_TOTAL_BYTES = int(
+    os.getenv("INVOICE_BATCH_MAX_TOTAL_BYTES", str(200 * 1024 * 1024))
+)
+
+
+class BatchTooLarge(Exception):
+    pass
+
+
+def expand_uploads(uploads: list):
+    """(fájlnév, fájlobjektum) párokból a PDF-ek listája; a ZIP-eket kibontja.
+
+    Egy PDF (ZIP elem) legfeljebb UPLOAD_MAX_BYTES méretű lehet, a nagyobbak
+    hibaként kerülnek a listába. A ZIP elemeknél a deklarált méretet olvasás
+    előtt, a valódit olvasás közben ellenőrzi. Ha a PDF-ek együtt átlépik a
+    BATCH_MAX_TOTAL_BYTES korlátot, BatchTooLarge.
+
+    Visszaadja a PDF-eket és a nem feldolgozható fájlok (fájlnév, hiba) listáját.
+    """
+    pdfs = []
+    failures = []
+    total = 0
+    too_large = f"A PDF nagyobb, mint {UPLOAD_MAX_BYTES} bájt."
+
+    def add(name, fileobj):
+        nonlocal total
+        data = fileobj.read(UPLOAD_MAX_BYTES + 1)
+        if len(data) > UPLOAD_MAX_BYTES:
+            failures.append((name, too_large))
+            return
+        total += len(data)
+        if total > BATCH_MAX_TOTAL_BYTES:
+            raise BatchTooLarge()
+        pdfs.append((name, data))
+
+    for filename, fileobj in uploads:
+        is_pdf = fileobj.read(4) == b"%PDF"
+        fileobj.seek(0)
+        if is_pdf:
+            add(filename, fileobj)
+        elif zipfile.is_zipfile(fileobj):
+            fileobj.seek(0)
+            with zipfile.ZipFile(fileobj) as archive:
+                for member in archive.infolist():
+                    if member.is_dir():
+                        continue
+                    name = f"{filename}/{member.filename}"
+                    if not member.filename.lower().endswith(".pdf"):
+                        failures.append((name, "A ZIP elem nem PDF."))
+                        continue
+                    if member.file_size > UPLOAD_MAX_BYTES:
+                        failures.append((name, too_large))
+                        continue
+                    if total + member.file_size > BATCH_MAX_TOTAL_BYTES:
+                        raise BatchTooLarge()
+                    with archive.open(member) as f:
+                        add(name, f)
+        else:
+            failures.append((filename, "A feltöltött fájl nem PDF vagy ZIP."))
+
+    return pdfs, failures
+
+
+def parse_batch(pdfs: list, session: Session, period: str | None = None):
+    """A PDF-ek párhuzamos feldolgozása a közös feltöltési folyamatkészleten.
+
+    A sikeresen feldolgozott számlák a store_invoice()-szal mentődnek, a
+    riportok így a kötegben feltöltött számlákat is látják.
+
+    Egy fájl hibája nem állítja meg a többit: a sikeres eredmények és a
+    (fájlnév, hiba) párok külön listában jönnek vissza, a feltöltési sorrendben.
+    """
+    results = []
+    failures = []
+
+    # fájlonként soros szövegkinyerés, a párhuzamosság a fájlok között van
+    process_pool = get_upload_executor().process_pool
+    futures = [
+        (filename, process_pool.submit(process_invoice, data, None, 1))
+        for filename, data in pdfs
+    ]
+    for (filename, future), (_, data) in zip(futures, pdfs):
+        try:
+            result = future.result()
+        except Exception as e:
+            failures.append((filename, f"Error processing PDF: {e}"))
+            continue
+
+        if not result["invoice_summary"] and not result["service_charges"]:
+            failures.append((filename, "No relevant invoice data found in the PDF."))
+            continue
+
+        try:
+            sha256 = hashlib.sha256(data).hexdigest()
+            store_invoice(session, sha256, result, period, filename)
+        except Exception as e:
+            failures.append((filename, f"Error storing invoice: {e}"))
+            continue
+        results.append((filename, result))
+
+    return results, failures
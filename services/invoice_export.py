@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+import math
+
+import pandas as pd
+
+from services.invoice_workbook import service_charges_frame, summary_frame
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Ennyi sor kerül egy kiküldött darabba
+EXPORT_CHUNK_ROWS = 1000
+
+
+def invoice_tables(result: dict, reference: dict) -> dict:
+    """A számla táblái ugyanazokkal az oszlopokkal és leképezéssel, mint az Excel lapokon."""
+    return {
+        "invoice_summary": summary_frame(result["invoice_summary"]),
+        "service_charges": service_charges_frame(result["service_charges"], reference),
+    }
+
+
+def _plain(value):
+    # NaN → None, numpy skalárok → Python típusok
+    if value is None:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if hasattr(value, "item"):
+        return _plain(value.item())
+    return value
+
+
+def stream_ndjson(tables: dict):
+    """Soronként egy JSON objektum; a "record" mező jelzi, melyik táblából jön."""
+    for name, df in tables.items():
+        columns = list(df.columns)
+        lines = []
+        for values in df.itertuples(index=False, name=None):
+            record = {"record": name}
+            record.update(zip(columns, map(_plain, values)))
+            lines.append(json.dumps(record, ensure_ascii=False))
+            if len(lines) >= EXPORT_CHUNK_ROWS:
+                yield ("\n".join(lines) + "\n").encode("utf-8")
+                lines = []
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def stream_csv(df: pd.DataFrame):
+    """Egy tábla CSV-ként, fejléccel; a hiányzó értékek üres mezők."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(df.columns)
+
+    for number, values in enumerate(df.itertuples(index=False, name=None), start=1):
+        writer.writerow(["" if v is None else v for v in map(_plain, values)])
+        if number % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode("utf-8")
+
+
+def parquet_bytes(df: pd.DataFrame) -> bytes:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = io.BytesIO()
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), sink)
+    return sink.getvalue()
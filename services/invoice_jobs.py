@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+
+from sqlmodel import Session, delete, select, update
+
+from database.connection import engine
+from database.models import InvoiceJob, JobStatus
+from services.invoice_store import store_invoice
+from services.reference_data import get_reference_data
+from services.upload_spool import spool_upload
+
+# A PDF feldolgozás és a pandas csak az első job futásakor töltődik be, így a
+# lifespan karbantartó feladata nem lassítja az indulást
+
+JOB_DIR = os.getenv(
+    "INVOICE_JOB_DIR", os.path.join(tempfile.gettempdir(), "invoice-jobs")
+)
+JOB_WORKERS = int(os.getenv("INVOICE_JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("INVOICE_JOB_QUEUE_SIZE", "8"))
+# Ennyi ideje nem frissült job gazdátlannak számít (pl. újraindult a worker)
+JOB_STALE_SECONDS = int(os.getenv("INVOICE_JOB_STALE_SECONDS", "300"))
+# Ennyi másodpercenként fut a karbantartás; kisebb legyen a JOB_STALE_SECONDS-nál
+JOB_SWEEP_INTERVAL_SECONDS = int(os.getenv("INVOICE_JOB_SWEEP_INTERVAL_SECONDS", "60"))
+# A kész és hibás jobok (sor, eredmény, PDF) ennyi ideig maradnak meg
+JOB_RETENTION_SECONDS = int(os.getenv("INVOICE_JOB_RETENTION_SECONDS", "86400"))
+
+
+class QueueFull(Exception):
+    pass
+
+
+def pdf_path(job_id: str) -> str:
+    return os.path.join(JOB_DIR, f"{job_id}.pdf")
+
+
+def result_path(job_id: str) -> str:
+    return os.path.join(JOB_DIR, f"{job_id}.xlsx")
+
+
+class InvoiceJobQueue:
+    """Korlátos, folyamaton belüli feldolgozósor az InvoiceJob táblával a háttérben.
+
+    A job állapota (és a feltöltött PDF a JOB_DIR-ben) túléli a worker
+    újraindulását. A sweep() rendszeresen frissíti a saját jobok heartbeatjét,
+    újra sorba állítja a gazdátlan jobokat, és törli a lejártakat.
+    """
+
+    def __init__(self):
+        os.makedirs(JOB_DIR, exist_ok=True)
+        self.executor = ThreadPoolExecutor(
+            max_workers=JOB_WORKERS, thread_name_prefix="invoice-job"
+        )
+        self.active = set()
+        self.lock = threading.Lock()
+
+    def submit(self, filename: str, fileobj) -> InvoiceJob:
+        """A feltöltés darabonként a JOB_DIR-be kerül, a memóriába nem olvassuk be.
+
+        Telt sornál QueueFull, az UPLOAD_MAX_BYTES-nál nagyobb fájlnál
+        UploadTooLarge; a tartalmat csak szabad hely esetén olvassuk.
+        """
+        job_id = uuid.uuid4().hex
+        self._reserve(job_id)
+        try:
+            spooled = spool_upload(fileobj, directory=JOB_DIR)
+            os.replace(spooled.path, pdf_path(job_id))
+
+            with Session(engine) as session:
+                job = InvoiceJob(id=job_id, filename=filename or "invoice.pdf")
+                session.add(job)
+                session.commit()
+                session.refresh(job)
+        except Exception:
+            self._release(job_id)
+            _remove_files(job_id)
+            raise
+
+        self.executor.submit(self._run, job_id)
+        return job
+
+    def _reserve(self, job_id: str):
+        with self.lock:
+            if len(self.active) >= JOB_QUEUE_SIZE:
+                raise QueueFull()
+            self.active.add(job_id)
+
+    def _release(self, job_id: str):
+        with self.lock:
+            self.active.discard(job_id)
+
+    def _run(self, job_id: str):
+        from services.invoice_workbook import build_workbook
+        from services.invoice_processor import InvoiceProcessor
+        from services.parse_cache import ParseCache, parse_cache
+        from services.upload_executor import _parse, get_upload_executor
+
+        try:
+            self._update(job_id, status=JobStatus.running)
+            # A feldolgozó a lemezről olvas, a PDF nem kerül egészben a memóriába
+            with open(pdf_path(job_id), "rb") as f:
+                digest = hashlib.file_digest(f, "sha256").hexdigest()
+
+            backend = InvoiceProcessor(pdf_path(job_id)).backend
+            key = ParseCache.digest_key(digest, backend)
+            result = parse_cache.get(key)
+            if result is None:
+                # A feltöltésekkel közös folyamatkészleten, hogy a jobok száma ne
+                # növelje a feldolgozó folyamatokét; az oldalszám a végén kerül be
+                result = (
+                    get_upload_executor()
+                    .process_pool.submit(_parse, pdf_path(job_id), backend)
+                    .result()
+                )
+                parse_cache.put(key, result)
+            if not result["invoice_summary"] and not result["service_charges"]:
+                raise ValueError("No relevant invoice data found in the PDF.")
+
+            with Session(engine) as session:
+                # A riportokhoz; a jobnak nincs külön elszámolási hónapja, így az aktuális
+                store_invoice(
+                    session,
+                    digest,
+                    result,
+                    filename=session.get(InvoiceJob, job_id).filename,
+                )
+                reference = get_reference_data(session)
+            workbook = build_workbook(result, reference)
+            with open(result_path(job_id), "wb") as f:
+                for chunk in workbook:
+                    f.write(chunk)
+
+            pages = sum(1 for e in result["page_index"] if e["kind"] != "ignored")
+            self._update(
+                job_id,
+                status=JobStatus.done,
+                pages_done=pages,
+                pages_total=pages,
+                finished_at=datetime.now(timezone.utc),
+            )
+            os.remove(pdf_path(job_id))
+        except Exception as e:
+            self._update(
+                job_id,
+                status=JobStatus.failed,
+                error=str(e)[:1000],
+                finished_at=datetime.now(timezone.utc),
+            )
+        finally:
+            self._release(job_id)
+
+    def _update(self, job_id: str, **values):
+        values["heartbeat_at"] = datetime.now(timezone.utc)
+        with Session(engine) as session:
+            session.exec(
+                update(InvoiceJob).where(InvoiceJob.id == job_id).values(**values)
+            )
+            session.commit()
+
+    def sweep(self):
+        self._touch_active()
+        self._recover()
+        self._purge_expired()
+
+    def _touch_active(self):
+        # A sorban álló és hosszan futó saját jobok se tűnjenek gazdátlannak
+        with self.lock:
+            active = list(self.active)
+        if not active:
+            return
+        with Session(engine) as session:
+            session.exec(
+                update(InvoiceJob)
+                .where(
+                    InvoiceJob.id.in_(active),
+                    InvoiceJob.status.in_([JobStatus.queued, JobStatus.running]),
+                )
+                .values(heartbeat_at=datetime.now(timezone.utc))
+            )
+            session.commit()
+
+    def _recover(self):
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=JOB_STALE_SECONDS)
+        with Session(engine) as session:
+            stale_jobs = session.exec(
+                select(InvoiceJob).where(
+                    InvoiceJob.status.in_([JobStatus.queued, JobStatus.running]),
+                    InvoiceJob.heartbeat_at < cutoff,
+                )
+            ).all()
+
+            for job in stale_jobs:
+                with self.lock:
+                    if job.id in self.active:
+                        continue
+                try:
+                    self._reserve(job.id)
+                except QueueFull:
+                    # A maradékot a következő sweep veszi át
+                    break
+
+                resumable = os.path.exists(pdf_path(job.id))
+                # Feltételes frissítés: több uvicorn worker közül csak egy veszi át
+                claimed = session.exec(
+                    update(InvoiceJob)
+                    .where(
+                        InvoiceJob.id == job.id,
+                        InvoiceJob.heartbeat_at == job.heartbeat_at,
+                    )
+                    .values(
+                        status=JobStatus.queued if resumable else JobStatus.failed,
+                        pages_done=0,
+                        error=None if resumable else "Interrupted by a worker restart.",
+                        heartbeat_at=datetime.now(timezone.utc),
+                        finished_at=None if resumable else datetime.now(timezone.utc),
+                    )
+                ).rowcount
+                session.commit()
+
+                if claimed and resumable:
+                    self.executor.submit(self._run, job.id)
+                else:
+                    self._release(job.id)
+
+    def _purge_expired(self):
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=JOB_RETENTION_SECONDS)
+        with Session(engine) as session:
+            expired = session.exec(
+                select(InvoiceJob.id).where(
+                    InvoiceJob.status.in_([JobStatus.done, JobStatus.failed]),
+                    InvoiceJob.finished_at < cutoff,
+                )
+            ).all()
+            for job_id in expired:
+                _remove_files(job_id)
+            if expired:
+                session.exec(delete(InvoiceJob).where(InvoiceJob.id.in_(expired)))
+                session.commit()
+
+            # Sor nélkül maradt fájlok (pl. kézzel törölt job) a módosítási idejük alapján
+            with os.scandir(JOB_DIR) as entries:
+                for entry in entries:
+                    job_id = entry.name.partition(".")[0]
+                    if (
+                        entry.stat().st_mtime < cutoff.timestamp()
+                        and job_id not in self.active
+                        and session.get(InvoiceJob, job_id) is None
+                    ):
+                        os.remove(entry.path)
+
+
+def _remove_files(job_id: str):
+    for path in (pdf_path(job_id), result_path(job_id)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> InvoiceJobQueue:
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = InvoiceJobQueue()
+        return _job_queue
+
+
+async def run_job_maintenance():
+    """Lifespan háttérfeladat: indításkor, majd JOB_SWEEP_INTERVAL_SECONDS-onként sweep."""
+    while True:
+        try:
+            await asyncio.to_thread(get_job_queue().sweep)
+        except Exception as e:
+            print(f"⚠️ Számla jobok karbantartása sikertelen: {e}")
+        await asyncio.sleep(JOB_SWEEP_INTERVAL_SECONDS)
@@ -1,48 +1,377 @@
 import pdfplumber
+import pypdfium2
 import io
+import multiprocessing
+import os
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Növeld, ha a feldolgozás kimenete változik: a parse cache kulcsának része
+PARSER_VERSION = "9"
+
+SERVICE_SECTION_HEADERS = ("KISZÁMLÁZOTT DÍJAK", "ÜGYFÉLSZINTŰ DÍJAK")
+SERVICE_SECTION_TOTAL = "Kiszámlázott díjak összesen"
+# Hívásrészletező és reklám/tájékoztató oldalak, ezekből nem nyerünk ki semmit
+IGNORED_PAGE_HEADERS = (
+    "HÍVÁSRÉSZLETEZ",
+    "RÉSZLETES HÍVÁSLISTA",
+    "TÁJÉKOZTATÓ",
+    "AJÁNLAT",
+)
+# Az oldal tetejének ekkora hányadából olvassuk ki a fejlécet
+HEADER_STRIP_RATIO = 0.15
+
+TESZOR_PATTERN = re.compile(r"\b\d{2}\.\d{2}\.\d{1,2}\b")
+PHONE_PATTERN = re.compile(r"Telefonszám:\s*(36\d{9})")
+SUMMARY_SKIP_PATTERN = re.compile("összeg|Megnevezés|Összesen|Számlaösszesítő")
+AMOUNT_PATTERN = re.compile(r"-?\d[\d.]*(?:,\d+)?")
+
+
+class PdfplumberDocument:
+    """Layout-alapú szövegkinyerés pdfplumberrel (a referencia kimenet)."""
+
+    def __init__(self, pdf_source: bytes | str):
+        self.pdf = pdfplumber.open(
+            pdf_source if isinstance(pdf_source, str) else io.BytesIO(pdf_source)
+        )
+
+    def __len__(self):
+        return len(self.pdf.pages)
+
+    def page_text(self, index: int) -> str:
+        page = self.pdf.pages[index]
+        try:
+            return page.extract_text() or ""
+        finally:
+            page.close()
+
+    def close(self):
+        self.pdf.close()
+
+
+class PdfiumDocument:
+    """Gyors szövegkinyerés pypdfium2-vel, oldalankénti pdfplumber visszaeséssel.
+
+    A pypdfium2 a tartalomfolyam sorrendjében adja a sorokat, a pdfplumber
+    pozíció szerint. Ha egy oldal sorszerkezete nem felel meg annak, amit a
+    feldolgozó vár (lásd `_is_valid_page_text`), vagy az első sora nem a
+    pozíció szerinti fejléc, az oldalt pdfplumberrel olvassuk újra.
+    """
+
+    def __init__(self, pdf_source: bytes | str):
+        self.pdf_source = pdf_source
+        self.pdf = pypdfium2.PdfDocument(pdf_source)
+        self.fallback = None
+        self.fallback_pages = 0
+
+    def __len__(self):
+        return len(self.pdf)
+
+    def page_text(self, index: int) -> str:
+        page = self.pdf[index]
+        textpage = page.get_textpage()
+        raw_text = textpage.get_text_bounded()
+        header = _pdfium_header(page, textpage)
+        textpage.close()
+        page.close()
+
+        lines = [line.rstrip() for line in raw_text.splitlines()]
+        text = "\n".join(line for line in lines if line)
+        if text and _is_valid_page_text(text, header):
+            return text
+
+        if self.fallback is None:
+            self.fallback = PdfplumberDocument(self.pdf_source)
+        self.fallback_pages += 1
+        return self.fallback.page_text(index)
+
+    def page_header(self, index: int):
+        """(fejléc, van-e szakaszzáró sor) az oldal felső sávjából, layout nélkül."""
+        page = self.pdf[index]
+        textpage = page.get_textpage()
+        header = _pdfium_header(page, textpage)
+        searcher = textpage.search(SERVICE_SECTION_TOTAL, match_case=True)
+        has_total = searcher.get_next() is not None
+        searcher.close()
+        textpage.close()
+        page.close()
+        return header, has_total
+
+    def close(self):
+        self.pdf.close()
+        if self.fallback is not None:
+            self.fallback.close()
+
+
+EXTRACTION_BACKENDS = {
+    "pdfplumber": PdfplumberDocument,
+    "pypdfium2": PdfiumDocument,
+}
+
+
+def _is_ignored_header(header: str) -> bool:
+    return header.upper().startswith(IGNORED_PAGE_HEADERS)
+
+
+def _is_known_header(header: str) -> bool:
+    header = header.upper()
+    return (
+        header in SERVICE_SECTION_HEADERS
+        or header == "SZÁMLA"
+        or _is_ignored_header(header)
+    )
+
+
+def _pdfium_header(page, textpage) -> str:
+    """Az oldal felső sávjának legfelső sora, pozíció szerint.
+
+    A get_text_bounded() a tartalomfolyam sorrendjét követi, ezért a sort a
+    szövegdarabok (text rect) helyzete alapján választjuk ki, és csak a sor
+    közepén átmenő vékony sávot olvassuk ki, hogy a szomszédos, átlapoló
+    sorok karakterei ne kerüljenek bele. A kis írásjelek (pont, vessző)
+    kimaradhatnak, az ismert fejlécekben ilyen nincs.
+    """
+    left, bottom, right, top = page.get_bbox()
+    strip_bottom = top - (top - bottom) * HEADER_STRIP_RATIO
+    line = None
+    for index in range(textpage.count_rects()):
+        rect = textpage.get_rect(index)
+        if rect[3] > strip_bottom and (line is None or rect[3] > line[3]):
+            line = rect
+    if line is None:
+        return ""
+
+    middle = (line[1] + line[3]) / 2
+    return textpage.get_text_bounded(
+        left=left, bottom=middle - 0.5, right=right, top=middle + 0.5
+    ).strip()
+
+
+def _is_valid_page_text(text: str, header: str) -> bool:
+    # A feldolgozó az első sor alapján dönt az oldalról; ha az első sor vagy a
+    # pozíció szerinti fejléc ismert fejléc, a kettőnek egyeznie kell
+    first_line = text.split("\n")[0].strip()
+    if _is_known_header(first_line) or _is_known_header(header):
+        if first_line.upper() != header.upper():
+            return False
+
+    lines = text.split("\n")
+    if not _anchors_in_order(lines):
+        return False
+
+    # Minden TESZOR-t tartalmazó sornak egy sorban kell végződnie az összegekkel
+    for line in lines:
+        if not TESZOR_PATTERN.search(line):
+            continue
+        parts = line.rsplit(" ", 4)
+        if len(parts) < 5:
+            return False
+        if not (
+            AMOUNT_PATTERN.fullmatch(parts[-1]) and AMOUNT_PATTERN.fullmatch(parts[-2])
+        ):
+            return False
+    return True
+
+
+def _first_index(lines, predicate) -> int | None:
+    return next((i for i, line in enumerate(lines) if predicate(line)), None)
+
+
+def _anchors_in_order(lines) -> bool:
+    """A feldolgozó sorrendfüggő horgonyai pozíció szerinti sorrendben állnak-e.
+
+    A telefonszámot a "Tarifacsomag:" sorig keressük, a díjtételeket a
+    "Megnevezés" és a szakaszzáró sor között, az összesítőt a
+    "Számlaösszesítő" és az "Egyenlegközlő információ" között. Ha a
+    tartalomfolyam ezeket más sorrendben rajzolja ki, az oldalt újra kell
+    olvasni.
+    """
+    phone = _first_index(lines, PHONE_PATTERN.search)
+    tariff = _first_index(lines, lambda line: "Tarifacsomag:" in line)
+    table = _first_index(lines, lambda line: line.lstrip().startswith("Megnevezés"))
+    total = _first_index(
+        lines, lambda line: line.lstrip().startswith(SERVICE_SECTION_TOTAL)
+    )
+    summary = _first_index(lines, lambda line: "Számlaösszesítő" in line)
+    balance = _first_index(lines, lambda line: "Egyenlegközlő információ" in line)
+    charges = [i for i, line in enumerate(lines) if TESZOR_PATTERN.search(line)]
+
+    ordered_pairs = [(phone, tariff), (table, total), (summary, balance)]
+    if charges:
+        ordered_pairs += [(table, charges[0]), (charges[-1], total)]
+    return all(
+        before < after
+        for before, after in ordered_pairs
+        if before is not None and after is not None
+    )
+
+
+# Egy worker folyamat a teljes élettartama alatt egyszer nyitja meg a PDF-et
+_worker_document = None
+
+
+def _init_worker(pdf_source: bytes | str, backend: str):
+    global _worker_document
+    _worker_document = EXTRACTION_BACKENDS[backend](pdf_source)
+
+
+def _extract_pages(indexes: list[int]):
+    return [_worker_document.page_text(index) for index in indexes]
+
+
+def build_page_index(pdf_source: bytes | str):
+    """Oldaltérkép a pypdfium2-vel kiolvasott fejlécek és szakaszzáró sorok alapján.
+
+    Oldaltípusok: summary, section_start, section_continuation, section_end,
+    ignored és unknown (nincs fejléc, vagy nem ismerjük fel; biztonságból
+    feldolgozzuk). Csak az ignored oldalak maradnak ki a teljes
+    szövegkinyerésből: szakaszon kívüli oldalak, amelyek fejléce pozíció
+    szerint egy IGNORED_PAGE_HEADERS fejléc; ezekből a feldolgozó sosem nyerne
+    ki sort.
+    """
+    try:
+        document = PdfiumDocument(pdf_source)
+    except pypdfium2.PdfiumError:
+        document = PdfplumberDocument(pdf_source)
+        page_count = len(document)
+        document.close()
+        return [
+            {"page": number, "kind": "unknown"} for number in range(1, page_count + 1)
+        ]
+
+    page_index = []
+    in_section = False
+    try:
+        for index in range(len(document)):
+            header, has_total = document.page_header(index)
+            header = header.upper()
+
+            if header in SERVICE_SECTION_HEADERS and not in_section:
+                kind = "section_start"
+                in_section = True
+            elif in_section:
+                kind = "section_continuation"
+            elif header == "SZÁMLA":
+                kind = "summary"
+            elif _is_ignored_header(header):
+                kind = "ignored"
+            else:
+                kind = "unknown"
+
+            if in_section and has_total:
+                kind = "section_end"
+                in_section = False
+
+            page_index.append({"page": index + 1, "kind": kind})
+    finally:
+        document.close()
+    return page_index
 
 
 class InvoiceProcessor:
-    def __init__(self, pdf_bytes: bytes):
-        self.pdf_bytes = pdf_bytes
+    def __init__(
+        self,
+        pdf_source: bytes | str,
+        workers: int | None = None,
+        chunk_size: int | None = None,
+        backend: str | None = None,
+        progress=None,
+    ):
+        # A PDF tartalma vagy a fájl útvonala; útvonalnál a backendek a lemezről olvasnak
+        self.pdf_source = pdf_source
+        self.backend = backend or os.getenv("INVOICE_TEXT_BACKEND", "pdfplumber")
+        if self.backend not in EXTRACTION_BACKENDS:
+            raise ValueError(f"Unknown text extraction backend: {self.backend}")
+        self.workers = workers or int(os.getenv("INVOICE_PARSE_WORKERS", "1"))
+        self.chunk_size = chunk_size or int(os.getenv("INVOICE_PARSE_CHUNK_SIZE", "16"))
         self.invoice_summary_rows = []
         self.service_charge_rows = []
+        self.page_index = None
+        # progress(kész oldalak, feldolgozandó oldalak) minden kiolvasott oldal után
+        self.progress = progress
 
     def process(self):
-        with pdfplumber.open(io.BytesIO(self.pdf_bytes)) as pdf:
+        rows = {
+            "invoice_summary": self.invoice_summary_rows,
+            "service_charges": self.service_charge_rows,
+        }
+        for kind, row in self.iter_rows():
+            rows[kind].append(row)
+        return {**rows, "page_index": self.page_index}
+
+    def iter_rows(self):
+        """("invoice_summary" | "service_charges", sor) párok, ahogy a szakaszok lezárulnak.
 
-            is_service_section = False
-            service_lines_accumulator = []
+        Egyszerre csak az aktuális telefonszám-blokk sorai vannak a memóriában.
+        """
+        if self.page_index is None:
+            self.page_index = build_page_index(self.pdf_source)
+        pages_total = sum(1 for e in self.page_index if e["kind"] != "ignored")
 
-            for page in pdf.pages:
-                text = page.extract_text() or ""
-                if not text:
-                    continue
-                lines = text.split("\n")
-                header = lines[0].strip().upper()
+        block = None
 
-                if header in ["KISZÁMLÁZOTT DÍJAK", "ÜGYFÉLSZINTŰ DÍJAK"]:
-                    is_service_section = True
-                    service_lines_accumulator.extend(lines)
+        for pages_done, text in enumerate(self._page_texts(), start=1):
+            if self.progress:
+                self.progress(pages_done, pages_total)
+            if not text:
+                continue
+            lines = text.split("\n")
+            header = lines[0].strip().upper()
 
-                elif is_service_section:
-                    service_lines_accumulator.extend(lines)
+            if header in SERVICE_SECTION_HEADERS and block is None:
+                block = _ServiceBlock()
+            if block is not None:
+                block.feed(lines)
 
-                if is_service_section and any(
-                    "Kiszámlázott díjak összesen" in line for line in lines
-                ):
-                    self._process_service_charges(service_lines_accumulator)
-                    is_service_section = False
-                    service_lines_accumulator = []
+                if SERVICE_SECTION_TOTAL in text:
+                    for row in block.rows():
+                        yield "service_charges", row
+                    block = None
 
-                if header == "SZÁMLA":
-                    self._process_invoice_page(text)
+            if header == "SZÁMLA":
+                for row in self._process_invoice_page(text):
+                    yield "invoice_summary", row
 
-        return {
-            "invoice_summary": self.invoice_summary_rows,
-            "service_charges": self.service_charge_rows,
-        }
+    def _page_texts(self):
+        """A szükséges oldalak szövege eredeti sorrendben, soros vagy párhuzamos kinyeréssel.
+
+        A kiolvasott oldalak layout cache-ét azonnal eldobjuk.
+        """
+        indexes = [
+            entry["page"] - 1 for entry in self.page_index if entry["kind"] != "ignored"
+        ]
+
+        if self.workers <= 1:
+            document = EXTRACTION_BACKENDS[self.backend](self.pdf_source)
+            try:
+                for index in indexes:
+                    yield document.page_text(index)
+            finally:
+                document.close()
+            return
+
+        chunks = (
+            indexes[start : start + self.chunk_size]
+            for start in range(0, len(indexes), self.chunk_size)
+        )
+
+        # spawn: a hívó gyakran többszálú (uvicorn, job szálak), ennek forkolása nem biztonságos
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.pdf_source, self.backend),
+        ) as executor:
+            # Legfeljebb workers * 2 darab van úton, így a kész, de még fel nem
+            # dolgozott oldalszövegek száma nem nő az oldalszámmal.
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_extract_pages, chunk))
+                if len(pending) >= self.workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
 
     def _process_invoice_page(self, text: str):
         start = text.find("Számlaösszesítő")
@@ -50,73 +379,83 @@ class InvoiceProcessor:
         if start == -1 or end == -1:
             return
         for line in text[start:end].split("\n"):
-            if any(
-                k in line
-                for k in ["összeg", "Megnevezés", "Összesen", "Számlaösszesítő"]
-            ):
+            if SUMMARY_SKIP_PATTERN.search(line):
                 continue
 
-            teszor_match = re.search(r"\b\d{2}\.\d{2}\.\d{1,2}\b", line)
-            if teszor_match:
+            if TESZOR_PATTERN.search(line):
                 parts = line.rsplit(" ", 8)
                 if len(parts) == 9:
-                    self.invoice_summary_rows.append(parts)
+                    yield parts
             else:
                 parts = line.rsplit(" ", 7)
                 if len(parts) == 8:
                     parts.insert(4, "")  # empty TESZOR field
-                    self.invoice_summary_rows.append(parts)
+                    yield parts
 
-    def _process_service_charges(self, lines):
-        phone_number = "N/A"
-        for line in lines:
-            if "Tarifacsomag:" in line:
-                break
-            match = re.search(r"Telefonszám:\s*(36\d{9})", line)
-            if match:
-                phone_number = match.group(1)
-                break
 
-        try:
-            start_index = next(
-                i
-                for i, line in enumerate(lines)
-                if line.strip().startswith("Megnevezés")
-            )
-            end_index = next(
-                i
-                for i, line in enumerate(lines)
-                if line.strip().startswith("Kiszámlázott díjak összesen")
-            )
-        except StopIteration:
-            return
+class _ServiceBlock:
+    """Egy telefonszám-blokk soronkénti, egymenetes feldolgozása.
 
-        for line in lines[start_index + 1 : end_index]:
-            teszor_match = re.search(r"\b\d{2}\.\d{2}\.\d{1,2}\b", line)
-            if not teszor_match:
-                continue
+    Minden sort egyszer osztályoz: a telefonszámot a "Tarifacsomag:" sorig
+    keresi, a díjtétel sorokat pedig az első "Megnevezés" és az első
+    "Kiszámlázott díjak összesen" sor között bontja fel. Csak a már felbontott
+    díjtételeket tartja meg, amíg a blokk le nem zárul.
+    """
 
-            teszor = teszor_match.group()
-            parts = line.rsplit(" ", 4)
-            if len(parts) < 5:
+    def __init__(self):
+        self.phone_number = "N/A"
+        self.phone_resolved = False
+        self.in_table = False
+        self.table_closed = False
+        self.charges = []
+
+    def feed(self, lines):
+        for line in lines:
+            if not self.phone_resolved:
+                if "Tarifacsomag:" in line:
+                    self.phone_resolved = True
+                else:
+                    match = PHONE_PATTERN.search(line)
+                    if match:
+                        self.phone_number = match.group(1)
+                        self.phone_resolved = True
+
+            if self.table_closed:
                 continue
 
-            total_amount, vat_amount, vat_rate, net_amount = parts[-4:]
-            before_values = parts[0]
-            description = (
-                before_values.split(teszor)[0].strip()
-                if teszor in before_values
-                else before_values.strip()
-            )
+            stripped = line.lstrip()
+            if stripped.startswith(SERVICE_SECTION_TOTAL):
+                self.table_closed = True
+            elif self.in_table:
+                self._add_charge(line)
+            elif stripped.startswith("Megnevezés"):
+                self.in_table = True
+
+    def _add_charge(self, line):
+        teszor_match = TESZOR_PATTERN.search(line)
+        if not teszor_match:
+            return
+
+        parts = line.rsplit(" ", 4)
+        if len(parts) < 5:
+            return
 
-            self.service_charge_rows.append(
-                [
-                    phone_number,
-                    description,
-                    teszor,
-                    net_amount,
-                    vat_rate,
-                    vat_amount,
-                    total_amount,
-                ]
+        teszor = teszor_match.group()
+        description, total_amount, vat_amount, vat_rate, net_amount = parts
+        self.charges.append(
+            (
+                description.partition(teszor)[0].strip(),
+                teszor,
+                net_amount,
+                vat_rate,
+                vat_amount,
+                total_amount,
             )
+        )
+
+    def rows(self):
+        # lezáró sor nélkül (vagy ha az megelőzi a fejlécet) nincs érvényes tábla
+        if not (self.in_table and self.table_closed):
+            return
+        for charge in self.charges:
+            yield [self.phone_number, *charge]
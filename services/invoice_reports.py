@@ -0,0 +1,138 @@
+import os
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+
+from sqlmodel import Session, func, select
+
+from database.models import Invoice, InvoiceLine
+from services.reference_data import reference_data_cache
+
+REPORT_CACHE_ENTRIES = int(os.getenv("INVOICE_REPORT_CACHE_ENTRIES", "256"))
+
+# Az adatbázis ezekre az oszlopokra csoportosít; a leképezés a kis eredményen történik
+_GROUP_COLUMNS = {
+    "employee": (InvoiceLine.phone_number,),
+    "phone_number": (InvoiceLine.phone_number,),
+    "ledger_account": (InvoiceLine.teszor, InvoiceLine.vat_rate),
+    "vat_code": (InvoiceLine.teszor, InvoiceLine.vat_rate),
+}
+
+
+def _report_key(dimension: str, reference: dict, keys: tuple) -> str:
+    # Ugyanaz a leképezés és pótlás, mint a ServiceCharges lapon
+    if dimension == "phone_number":
+        return keys[0]
+    if dimension == "employee":
+        return reference["phone_user_map"].get(keys[0]) or "N/A"
+
+    mapping = reference["mapping_lookup"].get(keys)
+    if mapping is None:
+        return "Ismeretlen"
+    return mapping["LedgerAccount" if dimension == "ledger_account" else "VatCode"]
+
+
+def _data_version(session: Session) -> tuple:
+    # A számlák csak hozzáadódnak, így a darabszám + legnagyobb id elég verziónak
+    statement = select(func.count(Invoice.id), func.max(Invoice.id))
+    return tuple(session.exec(statement).one())
+
+
+def _aggregate(
+    session: Session,
+    reference: dict,
+    dimension: str,
+    from_period: str | None,
+    to_period: str | None,
+    monthly: bool,
+) -> list:
+    group_columns = _GROUP_COLUMNS[dimension]
+    if monthly:
+        group_columns = (InvoiceLine.period, *group_columns)
+
+    statement = select(
+        *group_columns,
+        func.sum(InvoiceLine.net_amount),
+        func.sum(InvoiceLine.vat_amount),
+        func.sum(InvoiceLine.total_amount),
+        func.count(),
+    ).group_by(*group_columns)
+    if from_period:
+        statement = statement.where(InvoiceLine.period >= from_period)
+    if to_period:
+        statement = statement.where(InvoiceLine.period <= to_period)
+
+    totals = {}
+    for row in session.exec(statement):
+        *keys, net, vat, total, line_count = row
+        period = keys.pop(0) if monthly else None
+        key = (period, _report_key(dimension, reference, tuple(keys)))
+
+        bucket = totals.setdefault(key, [Decimal(0), Decimal(0), Decimal(0), 0])
+        bucket[0] += net or 0
+        bucket[1] += vat or 0
+        bucket[2] += total or 0
+        bucket[3] += line_count
+
+    return [
+        {
+            **({"period": period} if monthly else {}),
+            dimension: key,
+            "net_amount": net,
+            "vat_amount": vat,
+            "total_amount": total,
+            "line_count": line_count,
+        }
+        for (period, key), (net, vat, total, line_count) in sorted(
+            totals.items(), key=lambda item: (item[0][0] or "", item[0][1] or "")
+        )
+    ]
+
+
+class InvoiceReportCache:
+    """Riporteredmények LRU cache-e (lekérdezés, számla- és törzsadat-verzió) kulccsal.
+
+    Új számla vagy módosított törzsadat után a kulcs megváltozik, így régi
+    eredmény nem szolgálható ki; a régi bejegyzések az LRU végén kiesnek.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def report(
+        self,
+        session: Session,
+        dimension: str,
+        from_period: str | None = None,
+        to_period: str | None = None,
+        monthly: bool = False,
+    ) -> list:
+        reference_version, reference = reference_data_cache.get_versioned(session)
+        key = (
+            dimension,
+            from_period,
+            to_period,
+            monthly,
+            _data_version(session),
+            reference_version,
+        )
+
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+
+        rows = _aggregate(
+            session, reference, dimension, from_period, to_period, monthly
+        )
+
+        with self.lock:
+            self.entries[key] = rows
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return rows
+
+
+invoice_report_cache = InvoiceReportCache(REPORT_CACHE_ENTRIES)
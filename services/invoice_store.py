@@ -0,0 +1,89 @@
+import os
+import re
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, insert, select
+
+from database.models import Invoice, InvoiceLine
+
+# Ennyi sor megy egy executemany hívásba
+INVOICE_LINE_BATCH_SIZE = int(os.getenv("INVOICE_LINE_BATCH_SIZE", "5000"))
+
+AMOUNT_PATTERN = re.compile(r"-?\d+(\.\d+)?")
+
+
+def parse_decimal(value: str) -> Decimal | None:
+    # "1.234,56" → Decimal("1234.56"); ami nem szám, abból None
+    cleaned = value.replace(".", "").replace(",", ".").strip()
+    if not AMOUNT_PATTERN.fullmatch(cleaned):
+        return None
+    return Decimal(cleaned)
+
+
+def current_period() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m")
+
+
+def line_values(invoice_id: int, period: str, row) -> dict:
+    phone_number, description, teszor, total, vat, vat_rate, net = row
+    return {
+        "invoice_id": invoice_id,
+        "period": period,
+        "phone_number": phone_number,
+        "description": description[:255] if description else description,
+        "teszor": teszor,
+        "vat_rate": vat_rate,
+        "net_amount": parse_decimal(net),
+        "vat_amount": parse_decimal(vat),
+        "total_amount": parse_decimal(total),
+    }
+
+
+def store_invoice(
+    session: Session,
+    sha256: str,
+    result: dict,
+    period: str | None = None,
+    filename: str | None = None,
+) -> Invoice:
+    """A számla díjtételeinek mentése egy tranzakcióban.
+
+    A sorok INVOICE_LINE_BATCH_SIZE méretű executemany kötegekben kerülnek be
+    (MSSQL-en a pyodbc fast_executemany útján). Ha a PDF (sha256) már szerepel,
+    a meglévő számlát adja vissza, és nem ír semmit.
+    """
+    existing = session.exec(select(Invoice).where(Invoice.sha256 == sha256)).first()
+    if existing:
+        return existing
+
+    period = period or current_period()
+    rows = result["service_charges"]
+    invoice = Invoice(
+        sha256=sha256, filename=filename, period=period, line_count=len(rows)
+    )
+
+    try:
+        session.add(invoice)
+        session.flush()
+
+        for start in range(0, len(rows), INVOICE_LINE_BATCH_SIZE):
+            session.exec(
+                insert(InvoiceLine),
+                params=[
+                    line_values(invoice.id, period, row)
+                    for row in rows[start : start + INVOICE_LINE_BATCH_SIZE]
+                ],
+            )
+        session.commit()
+    except IntegrityError:
+        # Egy párhuzamos feltöltés közben már elmentette ugyanezt a számlát
+        session.rollback()
+        return session.exec(select(Invoice).where(Invoice.sha256 == sha256)).one()
+    except Exception:
+        session.rollback()
+        raise
+
+    session.refresh(invoice)
+    return invoice
@@ -0,0 +1,184 @@
+import pandas as pd
+
+from services.xlsx_export import dataframe_sheet, stream_workbook
+
+SUMMARY_COLUMNS = [
+    "Megnevezés",
+    "Mennyiség",
+    "Mennyiségi egység",
+    "Egységár (Ft)",
+    "TESZOR szám",
+    "ÁFA kulcs",
+    "Nettó összeg (Ft)",
+    "ÁFA összeg (Ft)",
+    "Bruttó összeg (Ft)",
+]
+
+SERVICE_CHARGE_COLUMNS = [
+    "PhoneNumber",
+    "Description",
+    "TESZOR",
+    "TotalAmount",
+    "VATAmount",
+    "VATRate",
+    "NetAmount",
+]
+
+PIVOT_INDEX = [
+    "PhoneNumber",
+    "Employee",
+    "VATRate",
+    "Title",
+    "VatCode",
+    "LedgerAccount",
+]
+
+
+def summary_frame(rows) -> pd.DataFrame:
+    df_summary = pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+
+    for col in [
+        "Egységár (Ft)",
+        "Nettó összeg (Ft)",
+        "ÁFA összeg (Ft)",
+        "Bruttó összeg (Ft)",
+    ]:
+        df_summary[col] = (
+            df_summary[col]
+            .astype(str)
+            .str.replace(".", "", regex=False)
+            .str.replace(",", ".", regex=False)
+            .astype(float)
+        )
+    return df_summary
+
+
+MAPPING_COLUMNS = ["Title", "VatCode", "LedgerAccount"]
+
+AMOUNT_PATTERN = r"-?\d+(\.\d+)?"
+
+
+def parse_amounts(values: pd.Series) -> pd.Series:
+    # "1.234,56" → 1234.56; ami nem szám, abból NaN
+    cleaned = (
+        values.str.replace(".", "", regex=False)
+        .str.replace(",", ".", regex=False)
+        .str.strip()
+    )
+    return cleaned.where(cleaned.str.fullmatch(AMOUNT_PATTERN, na=False)).astype(float)
+
+
+def mapping_frame(mapping_lookup: dict) -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            (teszor, rate, *(mapping[col] for col in MAPPING_COLUMNS))
+            for (teszor, rate), mapping in mapping_lookup.items()
+        ],
+        columns=["TESZOR", "VATRate", *MAPPING_COLUMNS],
+    )
+
+
+def service_charges_frame(rows, reference: dict) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=SERVICE_CHARGE_COLUMNS)
+    df["Employee"] = df["PhoneNumber"].map(reference["phone_user_map"]).fillna("N/A")
+    df["LedgerTitle"] = df["TESZOR"].map(reference["teszor_category_map"]).fillna("N/A")
+
+    df = df.merge(
+        mapping_frame(reference["mapping_lookup"]),
+        on=["TESZOR", "VATRate"],
+        how="left",
+        validate="many_to_one",
+        indicator=True,
+    )
+    df.loc[df["_merge"] == "left_only", MAPPING_COLUMNS] = "Ismeretlen"
+    df = df.drop(columns="_merge")
+
+    for col in ["NetAmount", "VATAmount", "TotalAmount"]:
+        df[col] = parse_amounts(df[col])
+    return df
+
+
+def pivot_frame(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.pivot_table(
+        df,
+        index=PIVOT_INDEX,
+        values=["NetAmount", "VATAmount"],
+        aggfunc="sum",
+        fill_value=0,
+    ).reset_index()
+
+
+def build_workbook(result: dict, reference: dict):
+    """A számla munkafüzete bájtdarabok folyamaként (lásd stream_workbook).
+
+    A DataFrame-ek itt készülnek el, így a feldolgozási hibák még a válasz
+    megkezdése előtt jelentkeznek; csak az xlsx írása történik lustán.
+    """
+    sheets = []
+
+    if result["invoice_summary"]:
+        df_summary = summary_frame(result["invoice_summary"])
+        sheets.append(dataframe_sheet("InvoiceSummary", df_summary))
+
+    if result["service_charges"]:
+        df = service_charges_frame(result["service_charges"], reference)
+        sheets.append(dataframe_sheet("ServiceCharges", df))
+
+        if not df.empty:
+            sheets.append(dataframe_sheet("Kimutatás", pivot_frame(df)))
+
+    return stream_workbook(sheets)
+
+
+def build_batch_workbook(results: list, failures: list, reference: dict):
+    """Egy munkafüzet több számlából, SourceInvoice oszloppal és közös kimutatással.
+
+    `results` (fájlnév, InvoiceProcessor eredmény) párok, `failures` (fájlnév,
+    hibaüzenet) párok listája; utóbbiak a "Feldolgozás" lapra kerülnek.
+    """
+    summaries = []
+    charges = []
+    status_rows = []
+
+    for source, result in results:
+        if result["invoice_summary"]:
+            df_summary = summary_frame(result["invoice_summary"])
+            df_summary.insert(0, "SourceInvoice", source)
+            summaries.append(df_summary)
+        if result["service_charges"]:
+            df = service_charges_frame(result["service_charges"], reference)
+            df.insert(0, "SourceInvoice", source)
+            charges.append(df)
+        status_rows.append(
+            {
+                "SourceInvoice": source,
+                "Status": "OK",
+                "InvoiceSummaryRows": len(result["invoice_summary"]),
+                "ServiceChargeRows": len(result["service_charges"]),
+                "Error": "",
+            }
+        )
+    for source, error in failures:
+        status_rows.append(
+            {
+                "SourceInvoice": source,
+                "Status": "Hiba",
+                "InvoiceSummaryRows": 0,
+                "ServiceChargeRows": 0,
+                "Error": error,
+            }
+        )
+
+    sheets = [dataframe_sheet("Feldolgozás", pd.DataFrame(status_rows))]
+
+    if summaries:
+        sheets.append(
+            dataframe_sheet("InvoiceSummary", pd.concat(summaries, ignore_index=True))
+        )
+
+    if charges:
+        df = pd.concat(charges, ignore_index=True)
+        sheets.append(dataframe_sheet("ServiceCharges", df))
+        sheets.append(dataframe_sheet("Kimutatás", pivot_frame(df)))
+
+    return stream_workbook(sheets)
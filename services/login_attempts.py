@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+from collections import deque
+
+LOGIN_ATTEMPT_WINDOW_SECONDS = float(os.getenv("LOGIN_ATTEMPT_WINDOW_SECONDS", "300"))
+# Sikertelen belépések felhasználónként az ablakon belül
+LOGIN_MAX_FAILURES_PER_USERNAME = int(
+    os.getenv("LOGIN_MAX_FAILURES_PER_USERNAME", "10")
+)
+# Belépési és regisztrációs kérések IP címenként az ablakon belül (0 = nincs IP korlát).
+# Proxy mögött csak a TRUSTED_PROXY_HOPS beállításával együtt kapcsold be, különben
+# minden felhasználó a proxy címén osztozik
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_IP", "0"))
+# Ennyi megbízható proxy (pl. az App Service frontend) áll az alkalmazás előtt; a
+# kliens címe az X-Forwarded-For lánc ennyiedik eleme hátulról (0 = a közvetlen kapcsolat)
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+# Ennyi kulcs után a legrégebben használtak kiesnek
+LOGIN_ATTEMPT_MAX_KEYS = int(os.getenv("LOGIN_ATTEMPT_MAX_KEYS", "10000"))
+
+
+def client_address(peer: str | None, forwarded_for: str | None) -> str:
+    """A kliens IP címe; az X-Forwarded-For csak megbízható proxy mögött számít.
+
+    A lánc elejét a kliens tetszőlegesen kitöltheti, ezért hátulról, a
+    megbízható proxyk által hozzáfűzött elemek közül választunk.
+    """
+    if TRUSTED_PROXY_HOPS and forwarded_for:
+        chain = [part.strip() for part in forwarded_for.split(",") if part.strip()]
+        if len(chain) >= TRUSTED_PROXY_HOPS:
+            address = chain[-TRUSTED_PROXY_HOPS]
+            # Az App Service "cím:port" alakban adja tovább
+            if address.startswith("["):
+                return address[1:].partition("]")[0]
+            if address.count(":") == 1:
+                return address.partition(":")[0]
+            return address
+    return peer or "unknown"
+
+
+class AttemptLimiter:
+    """Csúszó ablakos számláló kulcsonként (pl. "user:alice", "ip:1.2.3.4").
+
+    A korlát a bcrypt munka előtt ellenőrződik, így egy túl aktív kulcs nem
+    tud CPU-t fogyasztani. Worker folyamatonként külön számol.
+    """
+
+    def __init__(self, window_seconds: float, max_keys: int):
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self.attempts = {}
+        self.lock = threading.Lock()
+
+    def _recent(self, key: str, now: float) -> deque:
+        attempts = self.attempts.get(key)
+        if attempts is None:
+            return deque()
+        while attempts and attempts[0] <= now - self.window_seconds:
+            attempts.popleft()
+        return attempts
+
+    def retry_after(self, key: str, limit: int) -> int | None:
+        """Másodpercek a következő engedett próbálkozásig, vagy None, ha nincs korlátozva."""
+        now = time.monotonic()
+        with self.lock:
+            attempts = self._recent(key, now)
+            if len(attempts) < limit:
+                return None
+            return int(attempts[0] + self.window_seconds - now) + 1
+
+    def record(self, key: str):
+        now = time.monotonic()
+        with self.lock:
+            attempts = self.attempts.pop(key, None) or deque()
+            attempts.append(now)
+            # dict beszúrási sorrend = utolsó használat; a legrégebbi kulcs esik ki
+            self.attempts[key] = attempts
+            while len(self.attempts) > self.max_keys:
+                del self.attempts[next(iter(self.attempts))]
+
+    def reset(self, key: str):
+        with self.lock:
+            self.attempts.pop(key, None)
+
+
+login_attempts = AttemptLimiter(LOGIN_ATTEMPT_WINDOW_SECONDS, LOGIN_ATTEMPT_MAX_KEYS)
@@ -0,0 +1,174 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from services.invoice_processor import PARSER_VERSION, InvoiceProcessor
+
+
+class ParseCache:
+    """Két szintű cache az InvoiceProcessor kimenetére, a PDF tartalma szerint kulcsolva.
+
+    Az első szint egy folyamaton belüli LRU bájtkerettel, a második tömörített
+    JSON fájlok egy könyvtárban, lejárati idővel és méretkorláttal. Mindkét szint
+    ugyanazt a gzip-elt JSON blobot tárolja.
+    """
+
+    def __init__(
+        self,
+        directory: str | None,
+        memory_budget: int,
+        disk_budget: int,
+        ttl_seconds: int,
+    ):
+        self.directory = directory
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self.ttl_seconds = ttl_seconds
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(pdf_bytes: bytes, backend: str) -> str:
+        return ParseCache.digest_key(hashlib.sha256(pdf_bytes).hexdigest(), backend)
+
+    @staticmethod
+    def digest_key(digest: str, backend: str) -> str:
+        """Kulcs egy már kiszámolt SHA-256 hexdigestből (pl. a feltöltés közben)."""
+        return f"v{PARSER_VERSION}-{backend}-{digest}"
+
+    def get(self, key: str):
+        with self.lock:
+            blob = self.memory.get(key)
+            if blob is not None:
+                self.memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return json.loads(gzip.decompress(blob))
+
+        blob = self._read_disk(key)
+        with self.lock:
+            if blob is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["disk_hits"] += 1
+            self._remember(key, blob)
+        return json.loads(gzip.decompress(blob))
+
+    def put(self, key: str, result: dict):
+        blob = gzip.compress(json.dumps(result, ensure_ascii=False).encode("utf-8"))
+        with self.lock:
+            self._remember(key, blob)
+        self._write_disk(key, blob)
+
+    def stats(self):
+        with self.lock:
+            return {
+                **self.counters,
+                "memory_entries": len(self.memory),
+                "memory_bytes": self.memory_bytes,
+            }
+
+    def _remember(self, key: str, blob: bytes):
+        if len(blob) > self.memory_budget:
+            return
+        if key in self.memory:
+            self.memory_bytes -= len(self.memory.pop(key))
+        self.memory[key] = blob
+        self.memory_bytes += len(blob)
+        while self.memory_bytes > self.memory_budget:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json.gz")
+
+    def _read_disk(self, key: str):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                blob = f.read()
+            # a módosítási idő jelzi a legutóbbi használatot (LRU a lemezen is)
+            os.utime(path)
+            return blob
+        except FileNotFoundError:
+            return None
+
+    def _write_disk(self, key: str, blob: bytes):
+        if not self.directory:
+            return
+        # atomikus csere, hogy párhuzamos worker ne olvasson félkész fájlt
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+        os.replace(tmp_path, self._path(key))
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json.gz"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.ttl_seconds:
+                _remove_quietly(entry.path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.disk_budget:
+                break
+            _remove_quietly(path)
+            total -= size
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+parse_cache = ParseCache(
+    directory=os.getenv(
+        "INVOICE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "invoice-cache")
+    ),
+    memory_budget=int(os.getenv("INVOICE_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024))),
+    disk_budget=int(os.getenv("INVOICE_CACHE_DISK_BYTES", str(1024 * 1024 * 1024))),
+    ttl_seconds=int(os.getenv("INVOICE_CACHE_TTL_SECONDS", str(30 * 24 * 3600))),
+)
+
+
+def process_invoice(
+    pdf_bytes: bytes, progress=None, workers: int | None = None
+) -> dict:
+    """InvoiceProcessor.process() eredménye, ha lehet a cache-ből."""
+    processor = InvoiceProcessor(pdf_bytes, workers=workers, progress=progress)
+    key = ParseCache.key(pdf_bytes, processor.backend)
+
+    result = parse_cache.get(key)
+    if result is None:
+        result = processor.process()
+        parse_cache.put(key, result)
+    elif progress:
+        pages = sum(1 for e in result["page_index"] if e["kind"] != "ignored")
+        progress(pages, pages)
+    return result
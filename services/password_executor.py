@@ -0,0 +1,63 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Ennyi bcrypt számítás fut egyszerre worker folyamatonként
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Ennyi kérés várakozhat a futók mögött; a többi azonnal 503-at kap
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+# Sorban állással együtt legfeljebb ennyi ideig vár egy kérés a hash-re
+PASSWORD_HASH_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "5"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(
+    os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", "5")
+)
+
+
+class PasswordHashBusy(Exception):
+    pass
+
+
+class PasswordExecutor:
+    """Saját szálkészlet a bcrypthez, hogy egy belépési hullám ne a Starlette
+    közös threadpoolját foglalja le.
+
+    A bcrypt a számítás alatt elengedi a GIL-t, így a szálak valóban
+    párhuzamosan futnak, és az event loop közben szabad. A várakozó sor
+    korlátos; ha megtelt, vagy a hash nem készül el időben, PasswordHashBusy.
+    """
+
+    def __init__(self):
+        self.pool = ThreadPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+        )
+        self.slots = threading.BoundedSemaphore(
+            PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_QUEUE
+        )
+
+    async def run(self, func, *args):
+        if not self.slots.acquire(blocking=False):
+            raise PasswordHashBusy()
+        try:
+            future = asyncio.wrap_future(self.pool.submit(func, *args))
+            # Időtúllépéskor a még sorban álló feladat törlődik, nem fut le feleslegesen
+            return await asyncio.wait_for(future, PASSWORD_HASH_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise PasswordHashBusy()
+        finally:
+            self.slots.release()
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+_password_executor = None
+_password_executor_lock = threading.Lock()
+
+
+def get_password_executor() -> PasswordExecutor:
+    global _password_executor
+    with _password_executor_lock:
+        if _password_executor is None:
+            _password_executor = PasswordExecutor()
+        return _password_executor
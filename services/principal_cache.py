@@ -0,0 +1,134 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from database.models import User, UserRead
+from services.token_cache import verified_token_cache
+
+# Egy feloldott felhasználó ennyi másodpercig szolgálható ki adatbázis nélkül (0 = nincs cache)
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_ENTRIES", "1024"))
+# A token id/szerep claimjei ennyi ideig elegendők az azonosításhoz (0 = soha)
+PRINCIPAL_CLAIMS_MAX_AGE_SECONDS = float(
+    os.getenv("PRINCIPAL_CLAIMS_MAX_AGE_SECONDS", "300")
+)
+# Kerüljenek-e id/szerep claimek a kiadott tokenbe
+TOKEN_PRINCIPAL_CLAIMS = os.getenv("TOKEN_PRINCIPAL_CLAIMS", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+
+def principal_version(user: User) -> str:
+    """Felhasználónkénti verzió a tokenbe és a cache kulcsba.
+
+    Szerepváltozásnál, jelszócserénél (password_changed_at), illetve törlés és
+    azonos néven újraregisztrálás (új id) után megváltozik. A hash maga nem
+    része: a belépéskori újrahashelés nem érvényteleníti a többi tokent.
+    """
+    changed = user.password_changed_at.isoformat() if user.password_changed_at else ""
+    source = f"{user.id}:{user.role.value}:{changed}"
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+
+def principal_claims(user: User) -> dict:
+    """A login által kiadott token tartalma."""
+    claims = {"username": user.username, "ver": principal_version(user)}
+    if TOKEN_PRINCIPAL_CLAIMS:
+        claims.update(
+            uid=user.id,
+            role=user.role.value,
+            created=user.created_at.isoformat(),
+        )
+    return claims
+
+
+def principal_from_claims(payload: dict) -> UserRead | None:
+    """UserRead a token claimjeiből, ha friss és minden szükséges claim megvan."""
+    issued_at = payload.get("iat")
+    if not PRINCIPAL_CLAIMS_MAX_AGE_SECONDS or issued_at is None:
+        return None
+    if time.time() - issued_at > PRINCIPAL_CLAIMS_MAX_AGE_SECONDS:
+        return None
+    if principal_cache.revoked_after(payload["username"], issued_at):
+        return None
+    if not all(key in payload for key in ("uid", "role", "created")):
+        return None
+    return UserRead(
+        id=payload["uid"],
+        username=payload["username"],
+        role=payload["role"],
+        created_at=payload["created"],
+    )
+
+
+class PrincipalCache:
+    """Feloldott felhasználók TTL + LRU cache-e (username, verzió) kulccsal.
+
+    A verzió a tokenből jön, így szerepváltozás után a régi tokenek nem
+    találnak bejegyzést. Az invalidate() azonnal eldobja egy felhasználó
+    bejegyzéseit ebben a workerben; a többi workerben a TTL korlátozza az elavulást.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.revoked = {}
+        self.lock = threading.Lock()
+
+    def get(self, username: str, version: str | None) -> UserRead | None:
+        key = (username, version)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return principal
+
+    def put(self, username: str, version: str | None, principal: UserRead):
+        if self.ttl_seconds <= 0:
+            return
+        with self.lock:
+            expires_at = time.monotonic() + self.ttl_seconds
+            self.entries[(username, version)] = (expires_at, principal)
+            self.entries.move_to_end((username, version))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, username: str):
+        """Szerepváltozás, törlés vagy jelszócsere után hívandó."""
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == username]:
+                del self.entries[key]
+            # Az eddig kiadott tokenek claimjei se legyenek elegendők; a claimek
+            # maximális koránál régebbi visszavonásokat már nem kell számon tartani
+            now = time.time()
+            self.revoked = {
+                name: revoked_at
+                for name, revoked_at in self.revoked.items()
+                if now - revoked_at <= PRINCIPAL_CLAIMS_MAX_AGE_SECONDS
+            }
+            self.revoked[username] = now
+        # A már ellenőrzött tokenjeit is újra kell dekódolni
+        verified_token_cache.evict_user(username)
+
+    def revoked_after(self, username: str, issued_at: float) -> bool:
+        with self.lock:
+            revoked_at = self.revoked.get(username)
+        return revoked_at is not None and issued_at <= revoked_at
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.revoked.clear()
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_ENTRIES)
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+
+from sqlmodel import Session, func, select, update
+
+from database.models import (
+    PhoneBook,
+    LedgerAccount,
+    VatSetting,
+    TeszorCode,
+    TeszorMapping,
+    ReferenceDataVersion,
+)
+
+# Két verzióellenőrzés között legalább ennyi másodperc telik el (0 = minden kérésnél)
+CHECK_INTERVAL_SECONDS = float(os.getenv("REFERENCE_DATA_CHECK_SECONDS", "0"))
+
+REFERENCE_TABLES = (PhoneBook, LedgerAccount, VatSetting, TeszorCode, TeszorMapping)
+
+
+def _version_query():
+    # Egyetlen kör: táblánként sorszám + legnagyobb id, plusz az explicit verziósor
+    columns = []
+    for model in REFERENCE_TABLES:
+        columns.append(select(func.count(model.id)).scalar_subquery())
+        columns.append(select(func.max(model.id)).scalar_subquery())
+    columns.append(
+        select(ReferenceDataVersion.version)
+        .where(ReferenceDataVersion.id == 1)
+        .scalar_subquery()
+    )
+    return select(*columns)
+
+
+def bump_version(session: Session):
+    """Az írással azonos tranzakcióban hívandó; a commit után minden worker újratölt."""
+    updated = session.exec(
+        update(ReferenceDataVersion)
+        .where(ReferenceDataVersion.id == 1)
+        .values(version=ReferenceDataVersion.version + 1)
+    ).rowcount
+    if not updated:
+        session.add(ReferenceDataVersion(id=1, version=1))
+    reference_data_cache.invalidate()
+
+
+class ReferenceDataCache:
+    """A Vodafone feldolgozás törzsadatai előre felépített dict-ekben.
+
+    Lustán frissül: minden hozzáféréskor (legfeljebb CHECK_INTERVAL_SECONDS
+    gyakorisággal) egy olcsó verziólekérdezés dönti el, hogy újra kell-e tölteni.
+    Mivel a verzió az adatbázisból jön, több uvicorn worker is koherens marad.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = None
+        self.version = None
+        self.checked_at = 0.0
+
+    def get(self, session: Session) -> dict:
+        return self.get_versioned(session)[1]
+
+    def get_versioned(self, session: Session) -> tuple:
+        """(verzió, adatok) pár; a verzió a belőle számolt eredmények cache kulcsához kell."""
+        with self.lock:
+            now = time.monotonic()
+            if self.data is not None and now - self.checked_at < CHECK_INTERVAL_SECONDS:
+                return self.version, self.data
+
+            version = tuple(session.exec(_version_query()).one())
+            if self.data is None or version != self.version:
+                self.data = _load(session)
+                self.version = version
+            self.checked_at = now
+            return self.version, self.data
+
+    def invalidate(self):
+        with self.lock:
+            self.data = None
+            self.version = None
+
+
+def _load(session: Session) -> dict:
+    phonebook = session.exec(select(PhoneBook)).all()
+    ledger_accounts = session.exec(select(LedgerAccount)).all()
+    vat_settings = session.exec(select(VatSetting)).all()
+    teszor_codes = session.exec(select(TeszorCode)).all()
+    teszor_mappings = session.exec(
+        select(TeszorMapping).order_by(TeszorMapping.id)
+    ).all()
+
+    ledger_by_id = {row.id: row for row in ledger_accounts}
+    vat_by_id = {row.id: row for row in vat_settings}
+    teszor_by_id = {row.id: row for row in teszor_codes}
+
+    # csak azok a hozzárendelések, amelyeknek mindhárom hivatkozása létezik
+    mappings = [
+        (
+            teszor_by_id[m.teszor_code_id],
+            vat_by_id[m.vatsetting_id],
+            ledger_by_id[m.ledgeraccount_id],
+        )
+        for m in teszor_mappings
+        if m.teszor_code_id in teszor_by_id
+        and m.vatsetting_id in vat_by_id
+        and m.ledgeraccount_id in ledger_by_id
+    ]
+
+    return {
+        "phone_user_map": {row.phone_number: row.owner for row in phonebook},
+        "teszor_category_map": {
+            teszor.teszor_code: ledger.title for teszor, _, ledger in mappings
+        },
+        # Ismétlődő (kód, kulcs) párnál a legkisebb id nyer, mint az importnál
+        "mapping_lookup": {
+            (teszor.teszor_code, vat.rate): {
+                "Title": ledger.title,
+                "VatCode": vat.code,
+                "LedgerAccount": ledger.account_number,
+            }
+            for teszor, vat, ledger in reversed(mappings)
+        },
+        "extraction_support": {
+            "phonebook": [row.model_dump() for row in phonebook],
+            "ledger_accounts": [row.model_dump() for row in ledger_accounts],
+            "vat_settings": [row.model_dump() for row in vat_settings],
+            "teszor_codes": [row.model_dump() for row in teszor_codes],
+        },
+    }
+
+
+reference_data_cache = ReferenceDataCache()
+
+
+def get_reference_data(session: Session) -> dict:
+    return reference_data_cache.get(session)
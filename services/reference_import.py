@@ -0,0 +1,381 @@
+import os
+
+import pandas as pd
+from sqlmodel import Session, delete, insert, select, update
+
+from database.models import (
+    LedgerAccount,
+    PhoneBook,
+    TeszorCode,
+    TeszorMapping,
+    VatSetting,
+)
+from services.reference_data import bump_version
+
+# Ennyi sor megy egy executemany hívásba
+REFERENCE_IMPORT_BATCH_SIZE = int(os.getenv("REFERENCE_IMPORT_BATCH_SIZE", "5000"))
+REFERENCE_IMPORT_MAX_ROWS = int(os.getenv("REFERENCE_IMPORT_MAX_ROWS", "100000"))
+# Törlésnél az IN lista mérete; az MSSQL legfeljebb 2100 paramétert enged
+DELETE_CHUNK_SIZE = 1000
+# Ennyi hibát adunk vissza, a többit csak megszámoljuk
+MAX_REPORTED_ERRORS = 100
+
+PHONEBOOK_COLUMNS = ("phone_number", "owner")
+MAPPING_COLUMNS = ("teszor_code", "vat_rate", "account_number")
+
+
+class ImportValidationError(Exception):
+    def __init__(self, errors: list):
+        super().__init__(f"{len(errors)} validation errors")
+        self.errors = errors
+
+
+def read_table(fileobj, filename: str, columns: tuple) -> pd.DataFrame:
+    """Az xlsx/CSV első lapja szövegként, kisbetűs oszlopnevekkel és levágott értékekkel.
+
+    A telefonszámok szövegként maradnak, hogy a vezető + és 0 ne vesszen el.
+    """
+    name = (filename or "").lower()
+    if name.endswith((".xlsx", ".xlsm")):
+        df = pd.read_excel(fileobj, dtype=str, keep_default_na=False)
+    elif name.endswith(".csv"):
+        # Az elválasztót (; vagy ,) a pandas ismeri fel
+        df = pd.read_csv(
+            fileobj,
+            dtype=str,
+            keep_default_na=False,
+            sep=None,
+            engine="python",
+            encoding="utf-8-sig",
+        )
+    else:
+        raise ImportValidationError(
+            [
+                {
+                    "row": None,
+                    "column": None,
+                    "error": "Only .xlsx and .csv are supported",
+                }
+            ]
+        )
+
+    df.columns = df.columns.str.strip().str.lower().str.replace(" ", "_")
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        raise ImportValidationError(
+            [{"row": None, "column": c, "error": "Missing column"} for c in missing]
+        )
+    if len(df) > REFERENCE_IMPORT_MAX_ROWS:
+        raise ImportValidationError(
+            [
+                {
+                    "row": None,
+                    "column": None,
+                    "error": f"At most {REFERENCE_IMPORT_MAX_ROWS} rows are allowed",
+                }
+            ]
+        )
+
+    df = df[list(columns)].apply(lambda column: column.str.strip())
+    return df.reset_index(drop=True)
+
+
+class _Errors:
+    """Szabályonként egy maszk; a sorszám a fájlbeli sor (fejléc = 1)."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.errors = []
+        self.count = 0
+
+    def check(self, mask: pd.Series, column: str, message: str):
+        rows = self.df.index[mask]
+        self.count += len(rows)
+        free = MAX_REPORTED_ERRORS - len(self.errors)
+        self.errors.extend(
+            {"row": int(row) + 2, "column": column, "error": message}
+            for row in rows[: max(free, 0)]
+        )
+
+    def raise_if_any(self):
+        if self.count:
+            if self.count > len(self.errors):
+                self.errors.append(
+                    {
+                        "row": None,
+                        "column": None,
+                        "error": f"{self.count - len(self.errors)} more errors",
+                    }
+                )
+            raise ImportValidationError(self.errors)
+
+
+def _required(errors: _Errors, df: pd.DataFrame, column: str, max_length: int):
+    errors.check(df[column] == "", column, "Required")
+    errors.check(df[column].str.len() > max_length, column, f"Max {max_length} chars")
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _apply(session: Session, model, inserts: list, updates: list, delete_ids: list):
+    for chunk in _chunks(inserts, REFERENCE_IMPORT_BATCH_SIZE):
+        session.exec(insert(model), params=chunk)
+    # Elsődleges kulcs szerinti kötegelt UPDATE (executemany)
+    for chunk in _chunks(updates, REFERENCE_IMPORT_BATCH_SIZE):
+        session.exec(update(model), params=chunk)
+    for chunk in _chunks(delete_ids, DELETE_CHUNK_SIZE):
+        session.exec(delete(model).where(model.id.in_(chunk)))
+
+
+def _text(value) -> str | None:
+    # Az outer merge a hiányzó szöveget NaN-ra cserélheti
+    return value if isinstance(value, str) else None
+
+
+def _ids(series: pd.Series) -> list:
+    return [int(value) for value in series]
+
+
+def _commit(session: Session, summary: dict, dry_run: bool) -> dict:
+    changed = any(
+        summary.get(key)
+        for key in ("inserted", "updated", "deleted", "teszor_codes_created")
+    )
+    if dry_run or not changed:
+        session.rollback()
+        return summary
+    try:
+        bump_version(session)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return summary
+
+
+def import_phonebook(
+    session: Session,
+    df: pd.DataFrame,
+    delete_missing: bool = False,
+    dry_run: bool = False,
+) -> dict:
+    """A telefonkönyv szinkronizálása a fájl tartalmára, phone_number kulccsal.
+
+    Új szám → INSERT, más tulajdonos → UPDATE, a fájlból hiányzó szám →
+    DELETE (ha delete_missing). Mindez egy tranzakcióban, a végén verzióemeléssel.
+    Ha a törlés minden meglévő sort érintene, ImportValidationError.
+    """
+    errors = _Errors(df)
+    _required(errors, df, "phone_number", 20)
+    errors.check(df["owner"].str.len() > 100, "owner", "Max 100 chars")
+    errors.check(
+        (df["phone_number"] != "") & df["phone_number"].duplicated(keep=False),
+        "phone_number",
+        "Duplicate phone number",
+    )
+    errors.raise_if_any()
+
+    incoming = df.assign(owner=df["owner"].where(df["owner"] != "", None))
+    current = pd.DataFrame(
+        session.exec(
+            select(PhoneBook.id, PhoneBook.phone_number, PhoneBook.owner)
+        ).all(),
+        columns=["id", "phone_number", "owner"],
+    )
+    merged = incoming.merge(
+        current,
+        on="phone_number",
+        how="outer",
+        suffixes=("", "_current"),
+        indicator=True,
+    )
+
+    new = merged[merged["_merge"] == "left_only"]
+    both = merged[merged["_merge"] == "both"]
+    changed = both[both["owner"].fillna("") != both["owner_current"].fillna("")]
+    removed = merged[merged["_merge"] == "right_only"]
+    if delete_missing:
+        _refuse_delete_all(kept=len(both), existing=len(current))
+    else:
+        removed = removed.iloc[0:0]
+
+    summary = {
+        "rows": len(df),
+        "inserted": len(new),
+        "updated": len(changed),
+        "deleted": len(removed),
+        "unchanged": len(both) - len(changed),
+        "dry_run": dry_run,
+    }
+    if not dry_run:
+        _apply(
+            session,
+            PhoneBook,
+            inserts=[
+                {"phone_number": phone_number, "owner": _text(owner)}
+                for phone_number, owner in zip(new["phone_number"], new["owner"])
+            ],
+            updates=[
+                {"id": int(id_), "owner": _text(owner)}
+                for id_, owner in zip(changed["id"], changed["owner"])
+            ],
+            delete_ids=_ids(removed["id"]),
+        )
+    return _commit(session, summary, dry_run)
+
+
+def _refuse_delete_all(kept: int, existing: int):
+    # Egy üres, csonka vagy rossz fájl a teljes táblát törölné
+    if existing and not kept:
+        raise ImportValidationError(
+            [
+                {
+                    "row": None,
+                    "column": None,
+                    "error": "The file has no rows in common with the current data; "
+                    "refusing to delete every existing row",
+                }
+            ]
+        )
+
+
+def _lowest_ids(rows: list) -> dict:
+    # Ismétlődő kulcsnál a legrégebbi (legkisebb id) sor számít
+    ids = {}
+    for id_, key in sorted(rows, key=lambda row: row[0]):
+        ids.setdefault(key, id_)
+    return ids
+
+
+def import_teszor_mappings(
+    session: Session,
+    df: pd.DataFrame,
+    delete_missing: bool = False,
+    dry_run: bool = False,
+) -> dict:
+    """A TESZOR hozzárendelések szinkronizálása, (teszor_code, vat_rate) kulccsal.
+
+    Az ÁFA kulcsnak és a főkönyvi számnak léteznie kell; a hiányzó TESZOR
+    kódok létrejönnek. Ismétlődő kulcsnál a legkisebb id-jű hozzárendelés
+    számít (a get_reference_data is ezt használja). Az ismétlődéseket és a
+    fájlból hiányzó hozzárendeléseket csak delete_missing mellett töröljük,
+    és akkor sem az összeset.
+    """
+    vat_ids = _lowest_ids(session.exec(select(VatSetting.id, VatSetting.rate)).all())
+    ledger_ids = _lowest_ids(
+        session.exec(select(LedgerAccount.id, LedgerAccount.account_number)).all()
+    )
+
+    errors = _Errors(df)
+    _required(errors, df, "teszor_code", 20)
+    _required(errors, df, "vat_rate", 4)
+    _required(errors, df, "account_number", 10)
+    errors.check(
+        (df["vat_rate"] != "") & ~df["vat_rate"].isin(vat_ids.keys()),
+        "vat_rate",
+        "Unknown VAT rate",
+    )
+    errors.check(
+        (df["account_number"] != "") & ~df["account_number"].isin(ledger_ids.keys()),
+        "account_number",
+        "Unknown ledger account",
+    )
+    errors.check(
+        (df["teszor_code"] != "")
+        & df.duplicated(["teszor_code", "vat_rate"], keep=False),
+        "teszor_code",
+        "Duplicate TESZOR code and VAT rate",
+    )
+    errors.raise_if_any()
+
+    teszor_ids = _lowest_ids(
+        session.exec(select(TeszorCode.id, TeszorCode.teszor_code)).all()
+    )
+    new_codes = sorted(set(df["teszor_code"]) - teszor_ids.keys())
+    if new_codes and not dry_run:
+        for chunk in _chunks(new_codes, REFERENCE_IMPORT_BATCH_SIZE):
+            session.exec(insert(TeszorCode), params=[{"teszor_code": c} for c in chunk])
+        teszor_ids = _lowest_ids(
+            session.exec(select(TeszorCode.id, TeszorCode.teszor_code)).all()
+        )
+
+    incoming = df.assign(
+        vatsetting_id=df["vat_rate"].map(vat_ids),
+        ledgeraccount_id=df["account_number"].map(ledger_ids),
+    )
+    current = pd.DataFrame(
+        session.exec(
+            select(
+                TeszorMapping.id,
+                TeszorCode.teszor_code,
+                VatSetting.rate,
+                TeszorMapping.vatsetting_id,
+                TeszorMapping.ledgeraccount_id,
+            )
+            .join(TeszorCode, TeszorMapping.teszor_code_id == TeszorCode.id)
+            .join(VatSetting, TeszorMapping.vatsetting_id == VatSetting.id)
+            .order_by(TeszorMapping.id)
+        ).all(),
+        columns=["id", "teszor_code", "vat_rate", "vatsetting_id", "ledgeraccount_id"],
+    )
+    duplicated = current.duplicated(["teszor_code", "vat_rate"])
+    merged = incoming.merge(
+        current[~duplicated],
+        on=["teszor_code", "vat_rate"],
+        how="outer",
+        suffixes=("", "_current"),
+        indicator=True,
+    )
+
+    new = merged[merged["_merge"] == "left_only"]
+    both = merged[merged["_merge"] == "both"]
+    changed = both[
+        (both["ledgeraccount_id"] != both["ledgeraccount_id_current"])
+        | (both["vatsetting_id"] != both["vatsetting_id_current"])
+    ]
+    delete_ids = []
+    if delete_missing:
+        _refuse_delete_all(kept=len(both), existing=int((~duplicated).sum()))
+        delete_ids = _ids(current.loc[duplicated, "id"]) + _ids(
+            merged.loc[merged["_merge"] == "right_only", "id"]
+        )
+
+    summary = {
+        "rows": len(df),
+        "inserted": len(new),
+        "updated": len(changed),
+        "deleted": len(delete_ids),
+        "unchanged": len(both) - len(changed),
+        "teszor_codes_created": len(new_codes),
+        "dry_run": dry_run,
+    }
+    if not dry_run:
+        _apply(
+            session,
+            TeszorMapping,
+            inserts=[
+                {
+                    "teszor_code_id": teszor_ids[code],
+                    "vatsetting_id": int(vat_id),
+                    "ledgeraccount_id": int(ledger_id),
+                }
+                for code, vat_id, ledger_id in zip(
+                    new["teszor_code"], new["vatsetting_id"], new["ledgeraccount_id"]
+                )
+            ],
+            updates=[
+                {
+                    "id": int(id_),
+                    "vatsetting_id": int(vat_id),
+                    "ledgeraccount_id": int(ledger_id),
+                }
+                for id_, vat_id, ledger_id in zip(
+                    changed["id"], changed["vatsetting_id"], changed["ledgeraccount_id"]
+                )
+            ],
+            delete_ids=delete_ids,
+        )
+    return _commit(session, summary, dry_run)
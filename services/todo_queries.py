@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from sqlmodel import case, func, select
+
+from database.models import Todo
+
+# A todo végpontok lekérdezései. Mindegyik a felhasználó soraira szűr, és a Todo
+# összetett indexeire épül; a benchmarks.todo_query_plans ellenőrzi, hogy egyik
+# sem olvassa végig a táblát.
+
+
+def todos_query(user_id: int, category: str | None, status: str | None = None):
+    query = select(Todo).where(Todo.user_id == user_id, Todo.category == category)
+    if status:
+        query = query.where(Todo.status == status)
+
+    # Rendezés (SQL Server-kompatibilis!)
+    return query.order_by(
+        case((Todo.status == "done", 1), else_=0),
+        case((Todo.deadline.is_(None), 1), else_=0),
+        Todo.deadline.asc(),
+        Todo.created_at.asc(),
+    )
+
+
+def todos_count_query(user_id: int, category: str | None):
+    return select(func.count()).where(
+        Todo.user_id == user_id, Todo.category == category
+    )
+
+
+def category_counts_query(user_id: int):
+    return (
+        select(Todo.category, func.count(Todo.id).label("count"))
+        .where(Todo.user_id == user_id)
+        .group_by(Todo.category)
+    )
+
+
+def upcoming_query(user_id: int, start: datetime, end: datetime):
+    return (
+        select(Todo)
+        .where(
+            Todo.user_id == user_id,
+            Todo.deadline >= start,
+            Todo.deadline <= end,
+            Todo.status != "done",
+        )
+        .order_by(Todo.deadline.asc())
+    )
+
+
+def done_between_query(user_id: int, start: datetime, end: datetime):
+    return select(Todo).where(
+        Todo.user_id == user_id,
+        Todo.status == "done",
+        Todo.completed_at >= start,
+        Todo.completed_at < end,
+    )
+
+
+def due_between_query(user_id: int, start: datetime, end: datetime):
+    return select(Todo).where(
+        Todo.user_id == user_id,
+        Todo.status != "done",
+        Todo.deadline >= start,
+        Todo.deadline < end,
+    )
@@ -0,0 +1,71 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Ennyi ellenőrzött token claimjeit tartjuk meg; a legrégebben használtak esnek ki
+TOKEN_CACHE_ENTRIES = int(os.getenv("TOKEN_CACHE_ENTRIES", "4096"))
+
+
+def _token_key(token: str) -> bytes:
+    # A token maga nem kerül a memóriába kulcsként, csak a kivonata
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+class VerifiedTokenCache:
+    """Már ellenőrzött JWT-k claimjei a token SHA-256 kivonatával kulcsolva.
+
+    Egy bejegyzés a token `exp` idejéig érvényes, így lejárt token nem
+    szolgálható ki a cache-ből. Csak pontosan ugyanaz a token ad találatot,
+    amelynek az aláírását egyszer már ellenőriztük.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, token: str) -> dict | None:
+        key = _token_key(token)
+        with self.lock:
+            claims = self.entries.get(key)
+            if claims is None:
+                return None
+            if claims["exp"] <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return claims
+
+    def put(self, token: str, claims: dict):
+        # exp nélküli token nem járna le a cache-ben sem
+        if self.max_entries <= 0 or "exp" not in claims:
+            return
+        key = _token_key(token)
+        with self.lock:
+            self.entries[key] = claims
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def evict(self, token: str):
+        with self.lock:
+            self.entries.pop(_token_key(token), None)
+
+    def evict_user(self, username: str):
+        """Egy felhasználó összes tokenjének eldobása (visszavonáskor)."""
+        with self.lock:
+            for key in [
+                key
+                for key, claims in self.entries.items()
+                if claims.get("username") == username
+            ]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+verified_token_cache = VerifiedTokenCache(TOKEN_CACHE_ENTRIES)
@@ -0,0 +1,88 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from services.invoice_processor import InvoiceProcessor
+from services.parse_cache import ParseCache, parse_cache
+
+# Ennyi folyamat végzi a PDF feldolgozást worker folyamatonként
+UPLOAD_PARSE_WORKERS = int(os.getenv("UPLOAD_PARSE_WORKERS", "2"))
+# Szálak a blokkoló lépésekhez (cache, adatbázis, pandas)
+UPLOAD_IO_THREADS = int(os.getenv("UPLOAD_IO_THREADS", "4"))
+# Egyszerre ennyi feltöltést fogad egy worker, a többi azonnal 503-at kap
+UPLOAD_MAX_CONCURRENT = int(os.getenv("UPLOAD_MAX_CONCURRENT", "2"))
+UPLOAD_RETRY_AFTER_SECONDS = int(os.getenv("UPLOAD_RETRY_AFTER_SECONDS", "30"))
+
+
+def _parse(pdf_source: bytes | str, backend: str) -> dict:
+    # A folyamaton belül már nincs értelme tovább bontani oldalakra
+    return InvoiceProcessor(pdf_source, workers=1, backend=backend).process()
+
+
+class UploadExecutor:
+    """A szinkron feltöltési lépések futtatója, hogy ne az event loopot foglalják.
+
+    A PDF feldolgozás egy folyamatkészletre, a blokkoló I/O és a pandas munka
+    egy szálkészletre kerül. A befogadást egy nem blokkoló szemafor korlátozza:
+    ha minden hely foglalt, a try_admit() várakozás helyett azonnal False.
+    """
+
+    def __init__(self):
+        # spawn: a többszálú szülőfolyamat (event loop, szálkészletek) forkolása nem biztonságos
+        self.process_pool = ProcessPoolExecutor(
+            max_workers=UPLOAD_PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self.thread_pool = ThreadPoolExecutor(
+            max_workers=UPLOAD_IO_THREADS, thread_name_prefix="upload-io"
+        )
+        self.slots = threading.BoundedSemaphore(UPLOAD_MAX_CONCURRENT)
+
+    def try_admit(self) -> bool:
+        return self.slots.acquire(blocking=False)
+
+    def release(self):
+        self.slots.release()
+
+    async def run_blocking(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.thread_pool, func, *args)
+
+    async def parse(self, pdf_source: bytes | str, digest: str | None = None) -> dict:
+        """A process_invoice() aszinkron megfelelője, ugyanazzal a cache-sel.
+
+        Fájl útvonal esetén a worker folyamat maga olvassa a PDF-et, így a
+        tartalom nem másolódik át; ilyenkor a `digest` (SHA-256) kötelező.
+        """
+        backend = InvoiceProcessor(pdf_source).backend
+        if digest is None:
+            key = await self.run_blocking(ParseCache.key, pdf_source, backend)
+        else:
+            key = ParseCache.digest_key(digest, backend)
+
+        result = await self.run_blocking(parse_cache.get, key)
+        if result is None:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self.process_pool, _parse, pdf_source, backend
+            )
+            await self.run_blocking(parse_cache.put, key, result)
+        return result
+
+    def shutdown(self):
+        self.process_pool.shutdown(wait=False, cancel_futures=True)
+        self.thread_pool.shutdown(wait=False, cancel_futures=True)
+
+
+_upload_executor = None
+_upload_executor_lock = threading.Lock()
+
+
+def get_upload_executor() -> UploadExecutor:
+    global _upload_executor
+    with _upload_executor_lock:
+        if _upload_executor is None:
+            _upload_executor = UploadExecutor()
+        return _upload_executor
@@ -0,0 +1,61 @@
+import base64
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+
+# Egy feltöltött PDF legnagyobb megengedett mérete bájtban
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+# Az átmeneti PDF-ek könyvtára; üresen a rendszer alapértelmezett temp könyvtára
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+@dataclass
+class SpooledUpload:
+    path: str
+    size: int
+    sha256: str
+
+    def to_base64(self) -> str:
+        # Csak csatolmány küldésekor kell, ezért nem tároljuk előre
+        with open(self.path, "rb") as f:
+            return base64.b64encode(f.read()).decode("utf-8")
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def spool_upload(
+    fileobj, max_bytes: int = UPLOAD_MAX_BYTES, directory: str | None = UPLOAD_SPOOL_DIR
+) -> SpooledUpload:
+    """A feltöltött fájl átmásolása egy névvel rendelkező átmeneti fájlba.
+
+    Darabonként olvas, közben számolja a méretet és az SHA-256 kivonatot; a
+    korlát átlépésekor UploadTooLarge kivételt dob és törli a részleges fájlt.
+    Egyszerre legfeljebb egy darab van a memóriában.
+    """
+    fd, path = tempfile.mkstemp(suffix=".pdf", dir=directory)
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := fileobj.read(SPOOL_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge()
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+
+    return SpooledUpload(path=path, size=size, sha256=digest.hexdigest())
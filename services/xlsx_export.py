@@ -0,0 +1,220 @@
+import io
+import math
+import numbers
+import re
+import zipfile
+from datetime import date, datetime
+from xml.sax.saxutils import escape, quoteattr
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Ennyi sor után adjuk tovább a kliensnek, ami addig a zip kimenetben összegyűlt
+FLUSH_EVERY_ROWS = 500
+
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+
+# XML 1.0-ban nem megengedett karakterek (pl. PDF szövegből vagy leírásból); az
+# escape() ezeket nem kezeli, és egy is elrontja a munkalapot
+_ILLEGAL_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+# cellXfs indexek a styles.xml-ben
+_STYLE_HEADER = 1
+_STYLE_DATETIME = 2
+_STYLE_DATE = 3
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+{sheets}
+</Types>"""
+
+_SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{index}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+
+_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets>{sheets}</sheets>
+</workbook>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+{sheets}
+<Relationship Id="rIdStyles" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+# A pandas/openpyxl fejlécstílusa (félkövér, vékony keret, középre igazítva)
+# és a dátumformátumok
+_STYLES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<numFmts count="2">
+<numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/>
+<numFmt numFmtId="165" formatCode="yyyy-mm-dd"/>
+</numFmts>
+<fonts count="2">
+<font><sz val="11"/><name val="Calibri"/><family val="2"/></font>
+<font><b/><sz val="11"/><name val="Calibri"/><family val="2"/></font>
+</fonts>
+<fills count="2">
+<fill><patternFill patternType="none"/></fill>
+<fill><patternFill patternType="gray125"/></fill>
+</fills>
+<borders count="2">
+<border><left/><right/><top/><bottom/><diagonal/></border>
+<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border>
+</borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="4">
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>
+<xf numFmtId="0" fontId="1" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1" applyAlignment="1"><alignment horizontal="center" vertical="top"/></xf>
+<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+</cellXfs>
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>"""
+
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    "<sheetData>"
+)
+_SHEET_END = "</sheetData></worksheet>"
+
+
+class _ChunkSink(io.RawIOBase):
+    """Nem kereshető kimenet a zipfile-nak; a beírt bájtokat darabonként adja tovább."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _column_letter(index: int) -> str:
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _cell(ref: str, value, style: int = 0) -> str:
+    style_attr = f' s="{style}"' if style else ""
+
+    if value is None or value != value:  # NaN, NaT
+        return ""
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"{style_attr}><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Integral):
+        return f'<c r="{ref}"{style_attr}><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Real):
+        number = float(value)
+        if not math.isfinite(number):
+            return ""
+        return f'<c r="{ref}"{style_attr}><v>{number!r}</v></c>'
+    if isinstance(value, datetime):
+        # Az Excel nem ismer időzónát: a tárolt (UTC) időt írjuk ki
+        serial = (value.replace(tzinfo=None) - _EXCEL_EPOCH).total_seconds() / 86400
+        return f'<c r="{ref}" s="{style or _STYLE_DATETIME}"><v>{serial!r}</v></c>'
+    if isinstance(value, date):
+        serial = (datetime.combine(value, datetime.min.time()) - _EXCEL_EPOCH).days
+        return f'<c r="{ref}" s="{style or _STYLE_DATE}"><v>{serial}</v></c>'
+
+    text = escape(_ILLEGAL_XML_CHARS.sub("", str(value)))
+    space = ' xml:space="preserve"' if text != text.strip() else ""
+    return f'<c r="{ref}" t="inlineStr"{style_attr}><is><t{space}>{text}</t></is></c>'
+
+
+def _row(number: int, values, style: int = 0) -> str:
+    cells = "".join(
+        _cell(f"{_column_letter(index)}{number}", value, style)
+        for index, value in enumerate(values)
+    )
+    return f'<row r="{number}">{cells}</row>'
+
+
+def stream_workbook(sheets):
+    """xlsx munkafüzet darabonként, állandó memóriaigénnyel.
+
+    `sheets` (lapnév, fejléc oszlopnevek, sorok) hármasok listája; a sorok
+    bármilyen (akár lusta) iterálhatók lehetnek. A lapokat soronként írja egy
+    nem kereshető zip folyamba, és FLUSH_EVERY_ROWS soronként visszaadja az
+    addig elkészült bájtokat, így a StreamingResponse azonnal küldheti őket.
+    """
+    sink = _ChunkSink()
+
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(
+            "[Content_Types].xml",
+            _CONTENT_TYPES.format(
+                sheets="\n".join(
+                    _SHEET_CONTENT_TYPE.format(index=index)
+                    for index in range(1, len(sheets) + 1)
+                )
+            ),
+        )
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr(
+            "xl/workbook.xml",
+            _WORKBOOK.format(
+                sheets="".join(
+                    f'<sheet name={quoteattr(name[:31])} sheetId="{index}" r:id="rId{index}"/>'
+                    for index, (name, _, _) in enumerate(sheets, start=1)
+                )
+            ),
+        )
+        archive.writestr(
+            "xl/_rels/workbook.xml.rels",
+            _WORKBOOK_RELS.format(
+                sheets="\n".join(
+                    f'<Relationship Id="rId{index}" '
+                    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                    f'Target="worksheets/sheet{index}.xml"/>'
+                    for index in range(1, len(sheets) + 1)
+                )
+            ),
+        )
+        archive.writestr("xl/styles.xml", _STYLES)
+        yield sink.drain()
+
+        for index, (_, columns, rows) in enumerate(sheets, start=1):
+            with archive.open(f"xl/worksheets/sheet{index}.xml", "w") as sheet:
+                sheet.write(_SHEET_START.encode("utf-8"))
+                sheet.write(_row(1, columns, _STYLE_HEADER).encode("utf-8"))
+
+                for number, values in enumerate(rows, start=2):
+                    sheet.write(_row(number, values).encode("utf-8"))
+                    if number % FLUSH_EVERY_ROWS == 0:
+                        chunk = sink.drain()
+                        if chunk:
+                            yield chunk
+
+                sheet.write(_SHEET_END.encode("utf-8"))
+            yield sink.drain()
+
+    yield sink.drain()
+
+
+def dataframe_sheet(name: str, df):
+    """(lapnév, oszlopok, sorok) hármas egy DataFrame-ből, index nélkül."""
+    return name, list(df.columns), df.itertuples(index=False, name=None)
@@ -1,20 +1,18 @@
 from fastapi import Depends, HTTPException
 from database.models import User, Role
-from database.connection import SessionDep
-from sqlmodel import select
-from routers.auth.oauth2 import oauth2_scheme, verify_token
+from database.connection import AsyncSessionDep
+from routers.auth.oauth2 import decode_token, oauth2_scheme, resolve_principal
 
 
-def get_current_user(session: SessionDep, token: str = Depends(oauth2_scheme)):
-    username = verify_token(token)
+async def get_current_user(
+    session: AsyncSessionDep, token: str = Depends(oauth2_scheme)
+):
+    principal = await resolve_principal(session, decode_token(token))
 
-    statement = select(User).where(User.username == username)
-    user = session.exec(statement).first()
-
-    if user is None:
+    if principal is None:
         raise HTTPException(status_code=401, detail="User not found")
 
-    return user
+    return principal
 
 
 def get_current_admin_user(current_user: User = Depends(get_current_user)):
@@ -1,6 +1,13 @@
+import os
+
 from passlib.context import CryptContext
 
-pwd_cxt = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt munkafaktor; eltérő körszámú hash a következő sikeres belépéskor újra készül
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_cxt = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS
+)
 
 
 class Hash:
@@ -9,3 +16,7 @@ class Hash:
 
     def verify(hashed_password, plain_password):
         return pwd_cxt.verify(plain_password, hashed_password)
+
+    def verify_and_update(hashed_password, plain_password):
+        # (egyezik-e, új hash vagy None); új hash, ha a tárolt elavult (needs_update)
+        return pwd_cxt.verify_and_update(plain_password, hashed_password)